@@ -0,0 +1,118 @@
+from array import array
+
+class BundleIndex:
+
+    # Per-bundle (slot) summary of its parallel edges, kept in sync by Solver next to
+    # the FeasibilityIndex. bundle_max[slot] bounds the residual capacity of the usable
+    # edges of the bundle from above: it starts at the largest capacity of the instance
+    # and becomes exact (0 if nothing is usable) once an edge of the bundle changes, so
+    # a bundle is only rejected in O(1) when it truly cannot carry the flow.
+    # by_residual holds each bundle's edges by decreasing usable residual, by_distance
+    # by increasing distance, both laid out like instance.adj_edges and tied by
+    # adj_edges order. They are sorted per bundle when a search first asks
+    # (residual_sorted / distance_sorted flags), so building the index costs no pass
+    # over the edges.
+    def __init__(self, instance, feasibility) -> None:
+        self.instance = instance
+        self.feasibility = feasibility
+        adj_edges = instance.adj_edges
+        slot_count = len(instance.adj_nodes)
+
+        top = max(instance.edge_capacity) if instance.edge_count else 0
+        self.bundle_max = array('q', [top]) * slot_count
+        self.by_residual = array('i', adj_edges)
+        self.residual_sorted = bytearray(slot_count)
+        if instance.criteria == "min_dist":
+            self.by_distance = adj_edges
+            self.distance_sorted = bytearray(b"\1") * slot_count
+        else:
+            self.by_distance = array('i', adj_edges)
+            self.distance_sorted = bytearray(slot_count)
+
+        # The two slots holding each edge (start side, end side), filled a node at a
+        # time when one of its edges is first updated
+        self.edge_slots = array('i', [-1]) * (2 * instance.edge_count)
+        self.node_indexed = bytearray(instance.node_count)
+        self.group_seen = bytearray(feasibility.group_alive)
+
+    def snapshot(self):
+        return (bytes(self.bundle_max), bytes(self.group_seen))
+
+    def restore(self, snapshot):
+        bundle_max, group_seen = snapshot
+        memoryview(self.bundle_max).cast('B')[:] = bundle_max
+        self.group_seen[:] = group_seen
+        # by_residual is not saved, every bundle is sorted again on its next use
+        self.residual_sorted[:] = bytes(len(self.residual_sorted))
+
+    def sort_by_residual(self, slot):
+        instance = self.instance
+        edge_capacity = instance.edge_capacity
+        edge_bucket = self.feasibility.edge_bucket
+        lo, hi = instance.bundle_offsets[slot], instance.bundle_offsets[slot + 1]
+        # Stable even reversed, so equal residuals keep their adj_edges order
+        self.by_residual[lo:hi] = array('i', sorted(instance.adj_edges[lo:hi],
+            key= lambda edge_id: edge_capacity[edge_id] if edge_bucket[edge_id] else 0, reverse=True))
+        self.residual_sorted[slot] = 1
+
+    def sort_by_distance(self, slot):
+        instance = self.instance
+        lo, hi = instance.bundle_offsets[slot], instance.bundle_offsets[slot + 1]
+        self.by_distance[lo:hi] = array('i', sorted(instance.adj_edges[lo:hi],
+            key= instance.edge_distance.__getitem__))
+        self.distance_sorted[slot] = 1
+
+    def refresh_slot(self, slot):
+        instance = self.instance
+        edge_capacity = instance.edge_capacity
+        edge_bucket = self.feasibility.edge_bucket
+        lo, hi = instance.bundle_offsets[slot], instance.bundle_offsets[slot + 1]
+        if hi - lo == 1:
+            edge_id = instance.adj_edges[lo]
+            self.bundle_max[slot] = edge_capacity[edge_id] if edge_bucket[edge_id] else 0
+            return
+        self.bundle_max[slot] = max([edge_capacity[edge_id] if edge_bucket[edge_id] else 0
+            for edge_id in instance.adj_edges[lo:hi]])
+        self.residual_sorted[slot] = 0
+
+    def index_node(self, node_id):
+        instance = self.instance
+        edge_start = instance.edge_start
+        edge_slots = self.edge_slots
+        bundle_offsets = instance.bundle_offsets
+        for slot in range(instance.node_offsets[node_id], instance.node_offsets[node_id + 1]):
+            for k in range(bundle_offsets[slot], bundle_offsets[slot + 1]):
+                edge_id = instance.adj_edges[k]
+                if edge_start[edge_id] == node_id:
+                    edge_slots[2 * edge_id] = slot
+                if instance.edge_end[edge_id] == node_id:
+                    edge_slots[2 * edge_id + 1] = slot
+        self.node_indexed[node_id] = 1
+
+    def update(self, edge_ids):
+        # Refresh the bundles of edges whose residual state just changed, and of every
+        # edge of a group that was saturated or freed again
+        instance = self.instance
+        feasibility = self.feasibility
+        group_alive = feasibility.group_alive
+        group_seen = self.group_seen
+        edge_group = instance.edge_group
+        changed = set(edge_ids)
+        for edge_id in edge_ids:
+            group_id = edge_group[edge_id]
+            if group_alive[group_id] != group_seen[group_id]:
+                group_seen[group_id] = group_alive[group_id]
+                changed.update(feasibility.group_edges[feasibility.group_offsets[group_id]:
+                    feasibility.group_offsets[group_id + 1]])
+
+        node_indexed = self.node_indexed
+        edge_slots = self.edge_slots
+        slots = set()
+        for edge_id in changed:
+            for node_id in (instance.edge_start[edge_id], instance.edge_end[edge_id]):
+                if not node_indexed[node_id]:
+                    self.index_node(node_id)
+            slots.add(edge_slots[2 * edge_id])
+            slots.add(edge_slots[2 * edge_id + 1])
+        for slot in slots:
+            self.refresh_slot(slot)
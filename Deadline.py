@@ -0,0 +1,34 @@
+import time
+
+class Deadline:
+
+    # Global and per-demand time budgets. The search loops count expansions down
+    # from check_every and only read the clock when the countdown runs out.
+    def __init__(self, time_limit, tic = None, check_every = 128, demand_share = 8) -> None:
+        now = time.perf_counter_ns()
+        # tic is a time.time() stamp taken before parsing, that time is already spent
+        spent = int((time.time() - tic) * 1e9) if tic is not None else 0
+        self.start_ns = now - spent
+        self.end_ns = self.start_ns + int(time_limit * 1e9)
+        self.check_every = check_every
+        self.demand_share = demand_share
+        self.demand_end_ns = self.end_ns
+
+    def elapsed(self):
+        return (time.perf_counter_ns() - self.start_ns) / 1e9
+
+    def remaining(self):
+        return max(0, self.end_ns - time.perf_counter_ns()) / 1e9
+
+    def expired(self):
+        return time.perf_counter_ns() >= self.end_ns
+
+    def start_demand(self, demands_left):
+        # Each demand may use demand_share times its fair slice of the remaining time,
+        # whatever it does not use is shared again among the next ones
+        now = time.perf_counter_ns()
+        fair_slice = (self.end_ns - now) // max(demands_left, 1)
+        self.demand_end_ns = min(self.end_ns, now + fair_slice * self.demand_share)
+
+    def demand_expired(self):
+        return time.perf_counter_ns() >= self.demand_end_ns
@@ -1,23 +1,51 @@
+from bisect import bisect_left
+
 class Edge:
 
-    def __init__(self, edge_id, group_id, start_id, end_id, distance, capacity) -> None:
+    # Thin view over the edge arrays of an Instance
+    __slots__ = ("instance", "edge_id")
+
+    def __init__(self, instance, edge_id) -> None:
+        self.instance = instance
         self.edge_id = edge_id
-        self.group_id = group_id
-        self.start_id = start_id
-        self.end_id = end_id
-        self.distance = distance
-        self.capacity = capacity
-        self.constrained_edges = set()
 
-    def add_constraint(self, edge_id):
-        self.constrained_edges.add(edge_id)
+    @property
+    def group_id(self):
+        return self.instance.edge_group[self.edge_id]
+
+    @property
+    def start_id(self):
+        return self.instance.edge_start[self.edge_id]
+
+    @property
+    def end_id(self):
+        return self.instance.edge_end[self.edge_id]
+
+    @property
+    def distance(self):
+        return self.instance.edge_distance[self.edge_id]
+
+    @property
+    def capacity(self):
+        return self.instance.edge_capacity[self.edge_id]
+
+    @capacity.setter
+    def capacity(self, value):
+        self.instance.edge_capacity[self.edge_id] = value
+
+    def constrained_edges(self, node_id):
+        # Edges that cannot be chained with this one at node_id
+        return set(self.instance.node_peers(node_id, self.edge_id))
 
-    def is_constrained(self, other_edge):
-        return other_edge.edge_id in self.constrained_edges
+    def is_constrained(self, other_edge, node_id):
+        if not self.instance.node_constrained[node_id]:
+            return False
+        peers = self.instance.node_peers(node_id, self.edge_id)
+        i = bisect_left(peers, other_edge.edge_id)
+        return i < len(peers) and peers[i] == other_edge.edge_id
 
     def update_capacity(self, value):
-        self.capacity -= value
+        self.instance.edge_capacity[self.edge_id] -= value
 
     def can_add_demand(self, demand):
         return self.capacity >= demand.flow_rate
-    
\ No newline at end of file
@@ -0,0 +1,161 @@
+from array import array
+
+class FeasibilityIndex:
+
+    # Bit-level summary of the residual state, kept in sync by Solver.update_graph.
+    # edge_bucket[e] is the bit length of the residual capacity of e, or 0 once e is
+    # unusable (no capacity left or its group is saturated), so an edge can only carry
+    # flow_rate if edge_bucket[e] >= flow_rate.bit_length().
+    def __init__(self, instance) -> None:
+        self.instance = instance
+        edge_count = instance.edge_count
+
+        # Group -> edges CSR, used to kill every edge of a group at once
+        group_offsets = array('i', [0]) * (instance.group_count + 1)
+        for group_id in instance.edge_group:
+            group_offsets[group_id + 1] += 1
+        for g in range(instance.group_count):
+            group_offsets[g + 1] += group_offsets[g]
+        fill = group_offsets[:-1]
+        group_edges = array('i', [0]) * edge_count
+        for edge_id, group_id in enumerate(instance.edge_group):
+            group_edges[fill[group_id]] = edge_id
+            fill[group_id] += 1
+        self.group_offsets = group_offsets
+        self.group_edges = group_edges
+
+        self.group_alive = bytearray(g > 0 for g in instance.group_GFL)
+        self.node_alive = bytearray(s > 0 for s in instance.node_SFL)
+        group_alive = self.group_alive
+        self.edge_bucket = bytearray(c.bit_length() if c > 0 and group_alive[g] else 0
+            for c, g in zip(instance.edge_capacity, instance.edge_group))
+
+        # Generation stamps used to detect loops in a path, and to count how many of
+        # its edges share a group, without allocating
+        self.node_stamp = array('i', [0]) * instance.node_count
+        self.group_stamp = array('i', [0]) * instance.group_count
+        self.group_use = array('q', [0]) * instance.group_count
+        self.generation = 0
+
+    def snapshot(self):
+        return (bytes(self.group_alive), bytes(self.node_alive), bytes(self.edge_bucket))
+
+    def restore(self, snapshot):
+        group_alive, node_alive, edge_bucket = snapshot
+        self.group_alive[:] = group_alive
+        self.node_alive[:] = node_alive
+        self.edge_bucket[:] = edge_bucket
+
+    def commit(self, flow):
+        # Refresh the bits touched by a flow that was just applied to the residual state
+        instance = self.instance
+        edge_capacity = instance.edge_capacity
+        edge_group = instance.edge_group
+        group_GFL = instance.group_GFL
+        node_SFL = instance.node_SFL
+        edge_bucket = self.edge_bucket
+        group_alive = self.group_alive
+        node_alive = self.node_alive
+
+        node_id = flow.start_id
+        node_alive[node_id] = node_SFL[node_id] > 0
+        for edge_id in flow.edge_ids:
+            group_id = edge_group[edge_id]
+            if group_alive[group_id] and group_GFL[group_id] <= 0:
+                group_alive[group_id] = 0
+                for k in range(self.group_offsets[group_id], self.group_offsets[group_id + 1]):
+                    edge_bucket[self.group_edges[k]] = 0
+            elif edge_bucket[edge_id]:
+                capacity = edge_capacity[edge_id]
+                edge_bucket[edge_id] = capacity.bit_length() if capacity > 0 else 0
+            start_id = instance.edge_start[edge_id]
+            node_id = start_id if node_id != start_id else instance.edge_end[edge_id]
+            node_alive[node_id] = node_SFL[node_id] > 0
+
+    def release(self, flow):
+        # Refresh the bits touched by a flow that was just taken back out of the residual state
+        instance = self.instance
+        edge_capacity = instance.edge_capacity
+        edge_group = instance.edge_group
+        group_GFL = instance.group_GFL
+        node_SFL = instance.node_SFL
+        edge_bucket = self.edge_bucket
+        group_alive = self.group_alive
+        node_alive = self.node_alive
+
+        node_id = flow.start_id
+        node_alive[node_id] = node_SFL[node_id] > 0
+        for edge_id in flow.edge_ids:
+            group_id = edge_group[edge_id]
+            if group_alive[group_id]:
+                capacity = edge_capacity[edge_id]
+                edge_bucket[edge_id] = capacity.bit_length() if capacity > 0 else 0
+            elif group_GFL[group_id] > 0:
+                group_alive[group_id] = 1
+                for k in range(self.group_offsets[group_id], self.group_offsets[group_id + 1]):
+                    capacity = edge_capacity[self.group_edges[k]]
+                    edge_bucket[self.group_edges[k]] = capacity.bit_length() if capacity > 0 else 0
+            start_id = instance.edge_start[edge_id]
+            node_id = start_id if node_id != start_id else instance.edge_end[edge_id]
+            node_alive[node_id] = node_SFL[node_id] > 0
+
+    def is_feasible(self, flow):
+        # O(path) test with early exit: connected, loop free, alive nodes, usable edges
+        # with enough capacity, groups not used more than their GFL, and no constrained
+        # pair of consecutive edges
+        instance = self.instance
+        edge_ids = flow.edge_ids
+        if len(edge_ids) == 0:
+            return False
+        edge_start = instance.edge_start
+        edge_end = instance.edge_end
+        edge_capacity = instance.edge_capacity
+        edge_group = instance.edge_group
+        group_GFL = instance.group_GFL
+        node_constrained = instance.node_constrained
+        edge_bucket = self.edge_bucket
+        node_alive = self.node_alive
+        node_stamp = self.node_stamp
+        group_stamp = self.group_stamp
+        group_use = self.group_use
+        flow_rate = flow.flow_rate
+        need = flow_rate.bit_length()
+
+        self.generation += 1
+        generation = self.generation
+        node_id = flow.start_id
+        if not node_alive[node_id]:
+            return False
+        node_stamp[node_id] = generation
+        prev_edge = -1
+        for edge_id in edge_ids:
+            if edge_bucket[edge_id] < need or edge_capacity[edge_id] < flow_rate:
+                return False
+
+            # Forbidden pairs only apply at the node they were given for
+            if prev_edge >= 0 and node_constrained[node_id] and edge_id in instance.node_peers(node_id, prev_edge):
+                return False
+            prev_edge = edge_id
+
+            group_id = edge_group[edge_id]
+            if group_stamp[group_id] != generation:
+                group_stamp[group_id] = generation
+                group_use[group_id] = 1
+            else:
+                group_use[group_id] += 1
+                if group_use[group_id] > group_GFL[group_id]:
+                    return False
+
+            start_id = edge_start[edge_id]
+            if node_id == start_id:
+                node_id = edge_end[edge_id]
+            elif node_id == edge_end[edge_id]:
+                node_id = start_id
+            else:
+                return False
+
+            if not node_alive[node_id] or node_stamp[node_id] == generation:
+                return False
+            node_stamp[node_id] = generation
+
+        return node_id == flow.end_id
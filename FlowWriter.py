@@ -0,0 +1,35 @@
+import sys
+
+class FlowWriter:
+
+    # Output-ready solution: each flow is encoded to its output line when it is
+    # committed, and flush writes the count line and every line in one write.
+    # Lines are kept per flow so a flow ripped up later can be taken back out.
+    def __init__(self, stream = None) -> None:
+        self.stream = stream
+        self.lines = {}
+
+    def __len__(self):
+        return len(self.lines)
+
+    def add(self, flow):
+        edge_ids = flow.edge_ids
+        self.lines[flow.flow_id] = (("%d" + " %d" * len(edge_ids) + "\n") % (flow.flow_id, *edge_ids)).encode()
+
+    def clear(self):
+        self.lines.clear()
+
+    def remove(self, flow):
+        self.lines.pop(flow.flow_id, None)
+
+    def getvalue(self):
+        return b"%d\n" % len(self.lines) + b"".join(self.lines.values())
+
+    def flush(self):
+        stream = self.stream
+        if stream is None:
+            # Anything already printed through the text layer goes out first
+            sys.stdout.flush()
+            stream = sys.stdout.buffer
+        stream.write(self.getvalue())
+        stream.flush()
@@ -1,12 +1,24 @@
 class Group:
 
-    def __init__(self, group_id, edges_list = [], GFL = 100) -> None:
+    # Thin view over the group arrays of an Instance
+    __slots__ = ("instance", "group_id")
+
+    def __init__(self, instance, group_id) -> None:
+        self.instance = instance
         self.group_id = group_id
-        self.edge_ids_list = edges_list
-        self.GFL = GFL
 
-    def update_GFL(self, value=1):
-        self.GFL -= value
+    @property
+    def GFL(self):
+        return self.instance.group_GFL[self.group_id]
+
+    @GFL.setter
+    def GFL(self, value):
+        self.instance.group_GFL[self.group_id] = value
 
-    def add_edge(self, edge_id):
-        self.edge_ids_list.append(edge_id)
+    @property
+    def edge_ids_list(self):
+        edge_group = self.instance.edge_group
+        return [e for e in range(self.instance.edge_count) if edge_group[e] == self.group_id]
+
+    def update_GFL(self, value=1):
+        self.instance.group_GFL[self.group_id] -= value
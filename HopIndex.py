@@ -0,0 +1,87 @@
+from array import array
+
+class HopIndex:
+
+    # Memoized k-hop neighborhoods. The block of a target lists every node within depth
+    # hops of it together with the neighbor slot leading one hop closer, so a search
+    # can mark the neighborhood of its destination and walk straight in from any
+    # marked node. Blocks are built on first use, appended to flat arrays and shared
+    # by every later demand with the same destination. A block keeps at most max_ball
+    # nodes, the closest ones first, so next to a hub it is a truncated neighborhood
+    # and marking stays cheap. Once the blocks hold max_entries nodes they are all
+    # dropped and rebuilt on demand.
+    def __init__(self, instance, depth = 2, max_ball = 256, max_entries = 1 << 20) -> None:
+        self.instance = instance
+        self.depth = depth
+        self.max_ball = max_ball
+        self.max_entries = max_entries
+        # offset[target] is -1 until the block of target is built
+        self.offset = array('i', [-1]) * instance.node_count
+        self.length = array('i', [0]) * instance.node_count
+        self.hop_nodes = array('i')
+        self.hop_slots = array('i')
+        # Neighborhood of the last marked target
+        self.near_stamp = array('i', [0]) * instance.node_count
+        self.near_slot = array('i', [-1]) * instance.node_count
+        self.generation = 0
+
+    def clear(self):
+        self.offset = array('i', [-1]) * self.instance.node_count
+        self.hop_nodes = array('i')
+        self.hop_slots = array('i')
+
+    def build(self, target):
+        instance = self.instance
+        node_offsets = instance.node_offsets
+        adj_nodes = instance.adj_nodes
+        reverse_slot = instance.reverse_slot
+        near_stamp = self.near_stamp
+        max_ball = self.max_ball
+        self.generation += 1
+        generation = self.generation
+
+        if len(self.hop_nodes) + max_ball > self.max_entries:
+            self.clear()
+        hop_nodes = self.hop_nodes
+        hop_slots = self.hop_slots
+        begin = len(hop_nodes)
+        near_stamp[target] = generation
+        frontier = [target]
+        room = max_ball
+        for _ in range(self.depth):
+            next_frontier = []
+            for u in frontier:
+                for slot in range(node_offsets[u], node_offsets[u + 1]):
+                    v = adj_nodes[slot]
+                    if near_stamp[v] == generation:
+                        continue
+                    if room == 0:
+                        break
+                    room -= 1
+                    near_stamp[v] = generation
+                    hop_nodes.append(v)
+                    # Slot of v that leads back to u
+                    hop_slots.append(reverse_slot[slot])
+                    next_frontier.append(v)
+                if room == 0:
+                    break
+            frontier = next_frontier
+        self.offset[target] = begin
+        self.length[target] = len(hop_nodes) - begin
+
+    def mark(self, target):
+        # Stamp the neighborhood of target, near_stamp[v] == the returned generation
+        # means v is within depth hops and near_slot[v] leads one hop closer
+        if self.offset[target] < 0:
+            self.build(target)
+        self.generation += 1
+        generation = self.generation
+        near_stamp = self.near_stamp
+        near_slot = self.near_slot
+        hop_nodes = self.hop_nodes
+        hop_slots = self.hop_slots
+        begin = self.offset[target]
+        for k in range(begin, begin + self.length[target]):
+            near_stamp[hop_nodes[k]] = generation
+            near_slot[hop_nodes[k]] = hop_slots[k]
+        return generation
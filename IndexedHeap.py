@@ -0,0 +1,76 @@
+from array import array
+
+class IndexedHeap:
+
+    # Binary min-heap over item ids 0..capacity-1 with decrease-key. Entries are
+    # stamped with a generation, so clear() is O(1) and the heap is reused across searches.
+    def __init__(self, capacity) -> None:
+        self.items = array('i', [0]) * capacity
+        self.keys = array('q', [0]) * capacity
+        self.pos = array('i', [0]) * capacity
+        self.stamp = array('i', [0]) * capacity
+        self.generation = 1
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        self.generation += 1
+        self.size = 0
+
+    def push(self, item, key):
+        # Insert item, or lower its key. Returns False when the key does not improve
+        # or the item was already popped in this generation.
+        if self.stamp[item] == self.generation:
+            i = self.pos[item]
+            if i < 0 or key >= self.keys[item]:
+                return False
+        else:
+            self.stamp[item] = self.generation
+            i = self.size
+            self.size += 1
+        self.keys[item] = key
+        self.sift_up(i, item)
+        return True
+
+    def pop(self):
+        items, pos = self.items, self.pos
+        top = items[0]
+        pos[top] = -1
+        self.size -= 1
+        if self.size:
+            self.sift_down(0, items[self.size])
+        return top, self.keys[top]
+
+    def sift_up(self, i, item):
+        items, keys, pos = self.items, self.keys, self.pos
+        key = keys[item]
+        while i > 0:
+            parent = (i - 1) >> 1
+            parent_item = items[parent]
+            if keys[parent_item] <= key:
+                break
+            items[i] = parent_item
+            pos[parent_item] = i
+            i = parent
+        items[i] = item
+        pos[item] = i
+
+    def sift_down(self, i, item):
+        items, keys, pos = self.items, self.keys, self.pos
+        key = keys[item]
+        size = self.size
+        child = 2 * i + 1
+        while child < size:
+            if child + 1 < size and keys[items[child + 1]] < keys[items[child]]:
+                child += 1
+            child_item = items[child]
+            if keys[child_item] >= key:
+                break
+            items[i] = child_item
+            pos[child_item] = i
+            i = child
+            child = 2 * i + 1
+        items[i] = item
+        pos[item] = i
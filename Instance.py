@@ -1,14 +1,196 @@
+from array import array
+from collections import Counter
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain
+from Node import Node
+from Edge import Edge
+from Group import Group
+
+class Views:
+
+    # Read-only sequence handing out thin Node/Edge/Group views on demand
+    def __init__(self, view_class, instance, count) -> None:
+        self.view_class = view_class
+        self.instance = instance
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0 or i >= self.count:
+            raise IndexError(i)
+        return self.view_class(self.instance, i)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.view_class(self.instance, i)
+
 class Instance:
 
     def __init__(self, node_count, edge_count, constraints_count, flow_count,
-                nodes_list, edges_list, groups, demands_list ) -> None:
-        
+                edge_group, edge_start, edge_end, edge_distance, edge_capacity,
+                constraint_nodes, constraint_edges1, constraint_edges2,
+                demands_list, SFL = 200, GFL = 100, constraint_offsets = None, constraint_peers = None) -> None:
+
         self.node_count = node_count
         self.edge_count = edge_count
         self.constraints_count = constraints_count
         self.flow_count = flow_count
-        
-        self.nodes_list = nodes_list
-        self.edges_list = edges_list
-        self.groups = groups
+
+        # Edge table, indexed by edge_id
+        self.edge_group = edge_group
+        self.edge_start = edge_start
+        self.edge_end = edge_end
+        self.edge_distance = edge_distance
+        self.edge_capacity = edge_capacity
+
+        # Constraint table, one row per constraint line
+        self.constraint_nodes = constraint_nodes
+        self.constraint_edges1 = constraint_edges1
+        self.constraint_edges2 = constraint_edges2
+
+        self.group_count = max(edge_group) + 1 if edge_count else 0
+
+        # Residual state
+        self.node_SFL = array('q', [SFL]) * node_count
+        self.group_GFL = array('q', [GFL]) * self.group_count
+        self.node_final = bytearray(node_count)
+
+        # Constraint CSR: constraint_peers[constraint_offsets[e]:constraint_offsets[e + 1]]
+        # are the sorted edge ids e cannot be chained with, edge_constrained[e] tells
+        # whether there is any, so unconstrained hops skip the lookup
+        if constraint_offsets is None:
+            constraint_offsets, constraint_peers = self.build_constraints()
+        self.constraint_offsets = constraint_offsets
+        self.constraint_peers = constraint_peers
+        self.edge_constrained = bytearray(map(bool, map(int.__sub__, constraint_offsets[1:], constraint_offsets[:-1])))
+
+        # The same pairs by the node they apply at: rows node_constraint_offsets[n]..[n + 1]
+        # are sorted (in edge, out edge) pairs that cannot be chained at n, both ways round
+        self.node_constraint_offsets, self.node_constraint_in, self.node_constraint_out = \
+            self.build_node_constraints()
+        self.node_constrained = bytearray(map(bool, map(int.__sub__,
+            self.node_constraint_offsets[1:], self.node_constraint_offsets[:-1])))
+
         self.demands_list = demands_list
+
+        # CSR adjacency, filled by build_adjacency
+        self.criteria = None
+        self.node_offsets = None
+        self.adj_nodes = None
+        self.bundle_offsets = None
+        self.adj_edges = None
+        self.reverse_slot = None
+
+        self.nodes_list = Views(Node, self, node_count)
+        self.edges_list = Views(Edge, self, edge_count)
+        self.groups = Views(Group, self, self.group_count)
+
+    def build_constraints(self):
+        # Both directions of every pair, as packed keys edge * edge_count + peer, deduplicated
+        edge_count = self.edge_count
+        keys = sorted(set(chain(
+            map(lambda e1, e2: e1 * edge_count + e2, self.constraint_edges1, self.constraint_edges2),
+            map(lambda e1, e2: e2 * edge_count + e1, self.constraint_edges1, self.constraint_edges2))))
+        constraint_peers = array('i', (key % edge_count for key in keys))
+        count = Counter(key // edge_count for key in keys)
+        constraint_offsets = array('i', accumulate(map(count.__getitem__, range(edge_count)), initial=0))
+        return constraint_offsets, constraint_peers
+
+    def build_node_constraints(self):
+        rows = sorted(set(chain(
+            zip(self.constraint_nodes, self.constraint_edges1, self.constraint_edges2),
+            zip(self.constraint_nodes, self.constraint_edges2, self.constraint_edges1))))
+        count = Counter(node_id for node_id, _, _ in rows)
+        node_constraint_offsets = array('i', accumulate(map(count.__getitem__, range(self.node_count)), initial=0))
+        node_constraint_in = array('i', (edge1_id for _, edge1_id, _ in rows))
+        node_constraint_out = array('i', (edge2_id for _, _, edge2_id in rows))
+        return node_constraint_offsets, node_constraint_in, node_constraint_out
+
+    def node_peers(self, node_id, edge_id):
+        # Sorted edge ids that cannot leave node_id after arriving through edge_id
+        lo, hi = self.node_constraint_offsets[node_id], self.node_constraint_offsets[node_id + 1]
+        lo = bisect_left(self.node_constraint_in, edge_id, lo, hi)
+        return self.node_constraint_out[lo:bisect_right(self.node_constraint_in, edge_id, lo, hi)]
+
+    def constrained_peers(self, edge_id):
+        # Sorted edge ids that cannot be chained with edge_id
+        return self.constraint_peers[self.constraint_offsets[edge_id]:self.constraint_offsets[edge_id + 1]]
+
+    def snapshot(self):
+        # Copy of the residual state (capacities, GFL, SFL), memcpy'd as raw bytes
+        return (bytes(self.edge_capacity), bytes(self.group_GFL), bytes(self.node_SFL))
+
+    def restore(self, snapshot):
+        # Written back in place, so views and solvers holding the arrays stay valid
+        for values, saved in zip((self.edge_capacity, self.group_GFL, self.node_SFL), snapshot):
+            memoryview(values).cast('B')[:] = saved
+
+    def build_adjacency(self, criteria = "min_dist"):
+        # Two-level CSR: node_offsets[n]..node_offsets[n+1] are the neighbor slots of n,
+        # adj_nodes[slot] is the neighbor and bundle_offsets[slot]..bundle_offsets[slot+1]
+        # index the parallel edges to it in adj_edges.
+        node_count, edge_count = self.node_count, self.edge_count
+        edge_start, edge_end = self.edge_start, self.edge_end
+
+        pairs = set(zip(map(min, edge_start, edge_end), map(max, edge_start, edge_end)))
+        degree = Counter(chain.from_iterable(pairs))
+        del pairs
+
+        # Neighbors are visited by decreasing degree
+        rank = [0] * node_count
+        for r, n in enumerate(sorted(range(node_count), key= degree.__getitem__, reverse=True)):
+            rank[n] = r
+
+        if criteria == "min_dist":
+            edge_key = self.edge_distance
+        elif criteria == "max_cap":
+            top = max(self.edge_capacity) if edge_count else 0
+            edge_key = [top - c for c in self.edge_capacity]
+        else:
+            edge_key = [0] * edge_count
+        key_span = max(edge_key) + 1 if edge_count else 1
+
+        # Incidence k < edge_count is edge k seen from its start, the rest from its end
+        sources = array('i', edge_start)
+        sources.extend(edge_end)
+        targets = array('i', edge_end)
+        targets.extend(edge_start)
+        keys = [(i * node_count + rank[j]) * key_span + w
+            for i, j, w in zip(sources, targets, chain(edge_key, edge_key))]
+        order = sorted(range(2 * edge_count), key= keys.__getitem__)
+        del keys
+
+        adj_edges = array('i', (k if k < edge_count else k - edge_count for k in order))
+        sources = array('i', map(sources.__getitem__, order))
+        targets = array('i', map(targets.__getitem__, order))
+
+        # A new bundle starts wherever the (node, neighbor) pair changes
+        bundle_offsets = array('i', [k for k, (i, j, last_i, last_j)
+            in enumerate(zip(sources, targets, [-1] + sources[:-1].tolist(), [-1] + targets[:-1].tolist()))
+            if i != last_i or j != last_j])
+        adj_nodes = array('i', map(targets.__getitem__, bundle_offsets))
+        bundle_offsets.append(2 * edge_count)
+
+        slot_sources = array('i', map(sources.__getitem__, bundle_offsets[:-1]))
+        slot_count = Counter(slot_sources)
+        node_offsets = array('i', accumulate(map(slot_count.__getitem__, range(node_count)), initial=0))
+
+        # reverse_slot[slot] is the slot of the neighbor leading back. The (node, neighbor)
+        # pairs are symmetric, so the j-th slot by (node, neighbor) is reversed by the
+        # j-th slot by (neighbor, node).
+        forward = sorted(range(len(adj_nodes)), key= array('q', map(lambda i, j: i * node_count + j,
+            slot_sources, adj_nodes)).__getitem__)
+        backward = sorted(range(len(adj_nodes)), key= array('q', map(lambda i, j: j * node_count + i,
+            slot_sources, adj_nodes)).__getitem__)
+        rank = sorted(range(len(adj_nodes)), key= forward.__getitem__)
+        reverse_slot = array('i', map(backward.__getitem__, rank))
+        del slot_sources, forward, backward, rank
+
+        self.criteria = criteria
+        self.node_offsets = node_offsets
+        self.adj_nodes = adj_nodes
+        self.bundle_offsets = bundle_offsets
+        self.adj_edges = adj_edges
+        self.reverse_slot = reverse_slot
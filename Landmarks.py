@@ -0,0 +1,100 @@
+from array import array
+from collections import deque
+from IndexedHeap import IndexedHeap
+
+class Landmarks:
+
+    # ALT lower bounds: exact distances from a few landmarks, computed once on the
+    # full graph. Residual updates only remove capacity, so the triangle inequality
+    # bound |d(L, t) - d(L, v)| stays admissible for the whole solve.
+    def __init__(self, instance, count = 4, weight = "distance") -> None:
+        if weight not in ("distance", "hops"):
+            raise ValueError("landmarks support distance or hops weights, not %s" % weight)
+        self.instance = instance
+        self.weight = weight
+        node_count = instance.node_count
+        count = min(count, node_count)
+
+        # Cheapest parallel edge of each neighbor slot
+        edge_distance = instance.edge_distance
+        adj_edges = instance.adj_edges
+        bundle_offsets = instance.bundle_offsets
+        self.slot_weight = array('q', (min(edge_distance[adj_edges[k]]
+            for k in range(bundle_offsets[slot], bundle_offsets[slot + 1]))
+            for slot in range(len(instance.adj_nodes))))
+
+        # Farthest-point selection: each landmark is the node farthest from the ones
+        # already chosen, unreachable nodes first so every component gets one
+        tables = []
+        nearest = array('q', [-1]) * node_count
+        landmark = self.farthest(self.distances(0)) if node_count else 0
+        for _ in range(count):
+            table = self.distances(landmark)
+            tables.append(table)
+            for v in range(node_count):
+                if table[v] >= 0 and (nearest[v] < 0 or table[v] < nearest[v]):
+                    nearest[v] = table[v]
+            landmark = self.farthest(nearest)
+
+        # Node-major layout: the distances of node v are node_tables[v*count:(v+1)*count]
+        self.count = len(tables)
+        self.node_tables = array('q', [0]) * (node_count * self.count)
+        for l, table in enumerate(tables):
+            self.node_tables[l::self.count] = table
+
+    def farthest(self, table):
+        best, best_value = 0, -1
+        for v, d in enumerate(table):
+            if d < 0:
+                return v
+            if d > best_value:
+                best, best_value = v, d
+        return best
+
+    def distances(self, source):
+        # Single source distances on the full graph, -1 when unreachable
+        instance = self.instance
+        node_offsets = instance.node_offsets
+        adj_nodes = instance.adj_nodes
+        table = array('q', [-1]) * instance.node_count
+        table[source] = 0
+        if self.weight == "hops":
+            queue = deque([source])
+            while queue:
+                n = queue.popleft()
+                for slot in range(node_offsets[n], node_offsets[n + 1]):
+                    i = adj_nodes[slot]
+                    if table[i] < 0:
+                        table[i] = table[n] + 1
+                        queue.append(i)
+            return table
+
+        slot_weight = self.slot_weight
+        heap = IndexedHeap(instance.node_count)
+        heap.push(source, 0)
+        while len(heap):
+            n, dist = heap.pop()
+            table[n] = dist
+            for slot in range(node_offsets[n], node_offsets[n + 1]):
+                heap.push(adj_nodes[slot], dist + slot_weight[slot])
+        return table
+
+    def target_row(self, target):
+        return self.node_tables[target * self.count:(target + 1) * self.count]
+
+    def estimate(self, node_id, target_row):
+        # Lower bound on the distance from node_id to the target, -1 when the
+        # landmarks prove the target is unreachable
+        node_tables = self.node_tables
+        base = node_id * self.count
+        best = 0
+        for l in range(self.count):
+            dt, dv = target_row[l], node_tables[base + l]
+            if dt < 0 or dv < 0:
+                if dt != dv:
+                    return -1
+                continue
+            d = dt - dv if dt > dv else dv - dt
+            if d > best:
+                best = d
+        return best
@@ -1,23 +1,38 @@
 class Node:
 
-    def __init__(self, node_id, SFL = 200) -> None:
+    # Thin view over the node arrays of an Instance
+    __slots__ = ("instance", "node_id")
+
+    def __init__(self, instance, node_id) -> None:
+        self.instance = instance
         self.node_id = node_id
-        self.is_final = False
-        self.SFL = SFL
-        self.neighbors = {}
 
-    def set_final(self):
-        self.is_final = True 
-    def add_edge(self, edge):
-        other_node = edge.start_id if self.node_id != edge.start_id else edge.end_id
+    @property
+    def SFL(self):
+        return self.instance.node_SFL[self.node_id]
+
+    @SFL.setter
+    def SFL(self, value):
+        self.instance.node_SFL[self.node_id] = value
 
-        if other_node in self.neighbors:
-            self.neighbors[other_node].append(edge)
-        else:
-            self.neighbors[other_node] = [edge]
+    @property
+    def is_final(self):
+        return bool(self.instance.node_final[self.node_id])
+
+    @property
+    def neighbors(self):
+        instance = self.instance
+        neighbors = {}
+        for slot in range(instance.node_offsets[self.node_id], instance.node_offsets[self.node_id + 1]):
+            neighbors[instance.adj_nodes[slot]] = [instance.edges_list[instance.adj_edges[k]]
+                for k in range(instance.bundle_offsets[slot], instance.bundle_offsets[slot + 1])]
+        return neighbors
+
+    def set_final(self):
+        self.instance.node_final[self.node_id] = 1
 
     def decrease_SFL(self, value=1):
-        self.SFL -= value
+        self.instance.node_SFL[self.node_id] -= value
 
     def next_node(self, edge):
         return edge.start_id if self.node_id != edge.start_id else edge.end_id
@@ -0,0 +1,73 @@
+from array import array
+from collections import OrderedDict
+
+class PathCache:
+
+    # Bounded LRU cache of sub-paths of committed flows, keyed by (min, max) node pair.
+    # An entry is a slice lo:hi of a shared edge-id array plus a flag telling whether
+    # that slice walks from the smaller node id to the larger one. Every change to an
+    # edge's residual state bumps its version, and an entry is only served while none
+    # of its edges changed since it was stored.
+    def __init__(self, instance, max_entries = 100000) -> None:
+        self.instance = instance
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.edge_version = array('i', [0]) * instance.edge_count
+        self.epoch = 0
+        # Lookup counters, a stale entry is one dropped because an edge changed
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+
+    def touch(self, edge_ids):
+        self.epoch += 1
+        epoch = self.epoch
+        edge_version = self.edge_version
+        for edge_id in edge_ids:
+            edge_version[edge_id] = epoch
+
+    def add_path(self, nodes, edge_ids):
+        # Store every pair of (final node, any other node) along a committed path
+        node_final = self.instance.node_final
+        entries = self.entries
+        edges = array('i', edge_ids)
+        epoch = self.epoch
+        for p, final_node in enumerate(nodes):
+            if not node_final[final_node]:
+                continue
+            for q, other_node in enumerate(nodes):
+                if q == p or (node_final[other_node] and q < p):
+                    continue
+                lo, hi = (p, q) if p < q else (q, p)
+                key = (final_node, other_node) if final_node < other_node else (other_node, final_node)
+                entries[key] = (edges, lo, hi, nodes[lo] < nodes[hi], epoch)
+                entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def get(self, from_node, to_node):
+        # Edge ids walking from from_node to to_node, or None on a miss or a stale entry
+        key = (from_node, to_node) if from_node < to_node else (to_node, from_node)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        edges, lo, hi, forward, epoch = entry
+        edge_version = self.edge_version
+        for k in range(lo, hi):
+            if edge_version[edges[k]] > epoch:
+                del self.entries[key]
+                self.stale += 1
+                return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        path = edges[lo:hi].tolist()
+        if (from_node < to_node) != forward:
+            path.reverse()
+        return path
@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+import json
+import sys
+import time
+import tracemalloc
+
+class Profiler:
+
+    # Wall time, CPU time and (with memory=True) tracemalloc peak of each pipeline
+    # phase. Phases are run one after the other, not nested, since every phase
+    # resets the tracemalloc peak.
+    def __init__(self, memory = True) -> None:
+        self.memory = memory
+        self.phases = []
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name):
+        if self.memory:
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            record = {
+                "phase": name,
+                "wall": time.perf_counter() - wall,
+                "cpu": time.process_time() - cpu,
+            }
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record["peak_bytes"] = peak
+                record["current_bytes"] = current
+            self.phases.append(record)
+
+    def to_dict(self):
+        return {
+            "phases": list(self.phases),
+            "wall": sum(record["wall"] for record in self.phases),
+            "cpu": sum(record["cpu"] for record in self.phases),
+        }
+
+    def report(self, stream = None):
+        # Plain table on stderr by default, JSON when writing to a .json file
+        stream = stream or sys.stderr
+        if getattr(stream, "name", "").endswith(".json"):
+            json.dump(self.to_dict(), stream, indent=2)
+            return
+        for record in self.phases:
+            line = "%-16s wall %8.4fs cpu %8.4fs" % (record["phase"], record["wall"], record["cpu"])
+            if self.memory:
+                line += " peak %8.1f MiB" % (record["peak_bytes"] / 2**20)
+            stream.write(line + "\n")
+        total = self.to_dict()
+        stream.write("%-16s wall %8.4fs cpu %8.4fs\n" % ("total", total["wall"], total["cpu"]))
+        stream.flush()
+
+    def stop(self):
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
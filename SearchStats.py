@@ -0,0 +1,94 @@
+from array import array
+import json
+
+REJECT_REASONS = ("constraint", "group_GFL", "capacity", "node_SFL")
+
+class SearchStats:
+
+    # Opt-in counters filled by Solver when it is built with stats=True. The search
+    # loops only test `stats is not None` once per pop and on rejected edges, so a
+    # solver without stats pays next to nothing.
+    def __init__(self, instance, feasibility, cache) -> None:
+        self.instance = instance
+        self.feasibility = feasibility
+        self.cache = cache
+        self.reset()
+
+    def reset(self):
+        self.pops = 0
+        self.expansions = 0
+        self.rejections = dict.fromkeys(REJECT_REASONS, 0)
+        self.check_failures = 0
+        self.cache_invalid = 0
+        self.cache_base = (self.cache.hits, self.cache.misses, self.cache.stale)
+        # Wall time of each routed or rejected demand, in solve order
+        self.demand_ids = array('i')
+        self.demand_ns = array('q')
+        self.demand_routed = bytearray()
+
+    def pop(self, lo, hi):
+        # One node taken off a frontier, with its neighbor slots lo:hi about to be scanned
+        node_alive = self.feasibility.node_alive
+        adj_nodes = self.instance.adj_nodes
+        self.pops += 1
+        self.expansions += hi - lo
+        for slot in range(lo, hi):
+            if not node_alive[adj_nodes[slot]]:
+                self.rejections["node_SFL"] += 1
+
+    def reject_edge(self, edge_id):
+        # An edge turned down for its residual state: its group or its own capacity
+        if not self.feasibility.group_alive[self.instance.edge_group[edge_id]]:
+            self.rejections["group_GFL"] += 1
+        else:
+            self.rejections["capacity"] += 1
+
+    def reject_bundle(self, slot):
+        # A whole bundle turned down at once, counted edge by edge
+        instance = self.instance
+        for k in range(instance.bundle_offsets[slot], instance.bundle_offsets[slot + 1]):
+            self.reject_edge(instance.adj_edges[k])
+
+    def add_demand(self, demand, elapsed_ns, routed):
+        self.demand_ids.append(demand.demand_id)
+        self.demand_ns.append(elapsed_ns)
+        self.demand_routed.append(1 if routed else 0)
+
+    def latency(self):
+        # Per-demand wall time summary in seconds
+        times = sorted(self.demand_ns)
+        if not times:
+            return {"count": 0}
+        pick = lambda q: times[min(int(q * len(times)), len(times) - 1)] / 1e9
+        return {
+            "count": len(times),
+            "total": sum(times) / 1e9,
+            "mean": sum(times) / len(times) / 1e9,
+            "p50": pick(0.5),
+            "p90": pick(0.9),
+            "p99": pick(0.99),
+            "max": times[-1] / 1e9,
+        }
+
+    def to_dict(self, per_demand = False):
+        hits, misses, stale = self.cache_base
+        stats = {
+            "pops": self.pops,
+            "expansions": self.expansions,
+            "rejections": dict(self.rejections),
+            "check_failures": self.check_failures,
+            "cache": {
+                "hits": self.cache.hits - hits,
+                "misses": self.cache.misses - misses,
+                "stale": self.cache.stale - stale,
+                "invalid": self.cache_invalid,
+            },
+            "latency": self.latency(),
+        }
+        if per_demand:
+            stats["demands"] = [{"demand_id": d, "time": t / 1e9, "routed": bool(r)}
+                for d, t, r in zip(self.demand_ids, self.demand_ns, self.demand_routed)]
+        return stats
+
+    def dump(self, stream, per_demand = False):
+        json.dump(self.to_dict(per_demand), stream, indent=2)
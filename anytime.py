@@ -0,0 +1,23 @@
+import os
+import signal
+import time
+
+def install_anytime(writer, hard_limit = None, tic = None):
+    # On SIGTERM, or on SIGALRM once hard_limit seconds have passed since tic, write
+    # the flows committed so far and exit at once, so a slow run still answers
+    def flush_and_exit(signum, frame):
+        writer.flush()
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, flush_and_exit)
+    if hard_limit is not None and hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, flush_and_exit)
+        remaining = hard_limit - (time.time() - tic) if tic is not None else hard_limit
+        signal.setitimer(signal.ITIMER_REAL, max(remaining, 0.001))
+
+def cancel_anytime():
+    # Call before the regular flush so the handlers can't write a second time
+    if hasattr(signal, "SIGALRM"):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
@@ -0,0 +1,79 @@
+from reader import read_instance
+from heuristics import Solver
+from generator import generate_instance, TOPOLOGIES
+from portfolio import score_flows
+import argparse
+import json
+import os
+import tempfile
+import time
+
+# Solver.solve configurations compared by the benchmark
+STRATEGIES = {
+    "bfs_min_dist": {"criteria": "min_dist", "order": True},
+    "bfs_max_cap": {"criteria": "max_cap", "order": True},
+    "bidirectional": {"criteria": "min_dist", "order": True, "bidirectional": True},
+    "batch": {"criteria": "min_dist", "order": True, "bidirectional": True, "batch": True},
+    "improve": {"criteria": "min_dist", "order": True, "bidirectional": True, "improve": True},
+    "dijkstra": {"criteria": "dijkstra", "order": True},
+    "astar": {"criteria": "astar", "order": True, "weight": "hops"},
+}
+
+def run_case(path, strategy, time_limit, stats = False):
+    tic = time.time()
+    instance = read_instance(path, criteria=strategy.get("criteria", "min_dist"))
+    parse_time = time.time() - tic
+
+    # Counters always on, so latency covers the demands actually attempted before the deadline
+    solver = Solver(instance, stats=True)
+    start = time.time()
+    flows = solver.solve(time.time(), time_limit=time_limit, **strategy)
+    solve_time = time.time() - start
+
+    routed_rate, routed_count = score_flows(flows)
+    result = {
+        "parse_time": parse_time,
+        "solve_time": solve_time,
+        "demand_latency": solver.stats.latency(),
+        "routed_rate": routed_rate,
+        "routed_count": routed_count,
+        "demand_count": instance.flow_count,
+        "node_count": instance.node_count,
+        "edge_count": instance.edge_count,
+    }
+    if stats:
+        result["stats"] = solver.stats.to_dict()
+    return result
+
+def run_benchmark(topologies, sizes, strategies, seed = 0, time_limit = 1.9, stats = False):
+    report = []
+    with tempfile.TemporaryDirectory() as directory:
+        for topology in topologies:
+            for size in sizes:
+                path = os.path.join(directory, "%s-%d-%d.txt" % (topology, size, seed))
+                with open(path, "w") as f:
+                    f.write(generate_instance(topology, size, seed))
+                for name in strategies:
+                    result = run_case(path, STRATEGIES[name], time_limit, stats)
+                    result.update(topology=topology, size=size, seed=seed, strategy=name)
+                    report.append(result)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Solver strategies on synthetic instances")
+    parser.add_argument("--topologies", default=",".join(TOPOLOGIES))
+    parser.add_argument("--sizes", default="200,2000")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=1.9)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--stats", action="store_true", help="record Solver search counters")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.topologies.split(","), [int(s) for s in args.sizes.split(",")],
+        args.strategies.split(","), args.seed, args.time_limit, args.stats)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for result in report:
+        print("%(topology)-10s %(size)6d %(strategy)-14s parse %(parse_time).3fs "
+            "solve %(solve_time).3fs routed %(routed_count)d/%(demand_count)d (rate %(routed_rate)d)" % result)
@@ -0,0 +1,91 @@
+import math
+import random
+import sys
+
+# Seeded synthetic instances in the read_instance text format
+
+def grid_links(node_count, rng):
+    width = max(int(math.sqrt(node_count)), 1)
+    links = []
+    for n in range(node_count):
+        if (n + 1) % width and n + 1 < node_count:
+            links.append((n, n + 1))
+        if n + width < node_count:
+            links.append((n, n + width))
+    return links
+
+def geometric_links(node_count, rng, degree = 6):
+    # Points in the unit square joined when closer than a radius giving about degree neighbors
+    points = [(rng.random(), rng.random()) for _ in range(node_count)]
+    radius = math.sqrt(degree / (math.pi * max(node_count, 1)))
+    cells = {}
+    for n, (x, y) in enumerate(points):
+        cells.setdefault((int(x / radius), int(y / radius)), []).append(n)
+    links = []
+    for n, (x, y) in enumerate(points):
+        cx, cy = int(x / radius), int(y / radius)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for m in cells.get((cx + dx, cy + dy), ()):
+                    if m > n and (points[m][0] - x) ** 2 + (points[m][1] - y) ** 2 < radius * radius:
+                        links.append((n, m))
+    return links
+
+def hub_links(node_count, rng, hub_count = None):
+    # Fully meshed hubs, every other node attached to one or two hubs
+    hub_count = hub_count or max(2, int(math.sqrt(node_count) / 2))
+    hub_count = min(hub_count, node_count)
+    links = [(i, j) for i in range(hub_count) for j in range(i + 1, hub_count)]
+    for n in range(hub_count, node_count):
+        for hub in rng.sample(range(hub_count), min(rng.choice((1, 2)), hub_count)):
+            links.append((hub, n))
+    return links
+
+TOPOLOGIES = {
+    "grid": grid_links,
+    "geometric": geometric_links,
+    "hub": hub_links,
+}
+
+def generate_instance(topology, node_count, seed = 0, flow_count = None, constraint_ratio = 0.05):
+    rng = random.Random(seed)
+    links = TOPOLOGIES[topology](node_count, rng)
+    flow_count = flow_count if flow_count is not None else node_count
+
+    # Parallel edges between the same nodes share a group, like in data/input.txt
+    edges = []
+    incident = [[] for _ in range(node_count)]
+    for group_id, (i, j) in enumerate(links):
+        for _ in range(rng.choice((1, 1, 1, 2, 3))):
+            edge_id = len(edges)
+            edges.append((edge_id, group_id, i, j, rng.randint(10, 1000), rng.randint(100, 5000)))
+            incident[i].append(edge_id)
+            incident[j].append(edge_id)
+
+    constraints = []
+    candidates = [n for n in range(node_count) if len(incident[n]) > 1]
+    for _ in range(int(len(edges) * constraint_ratio) if candidates else 0):
+        n = rng.choice(candidates)
+        edge1_id, edge2_id = rng.sample(incident[n], 2)
+        constraints.append((n, edge1_id, edge2_id))
+
+    # Hub instances send traffic between spokes, the others between any two nodes
+    endpoints = range(node_count)
+    if topology == "hub" and node_count > 2 * max(2, int(math.sqrt(node_count) / 2)):
+        endpoints = range(max(2, int(math.sqrt(node_count) / 2)), node_count)
+    demands = []
+    for demand_id in range(flow_count if node_count > 1 else 0):
+        start_id, end_id = rng.sample(endpoints, 2)
+        demands.append((demand_id, start_id, end_id, rng.randint(10, 300)))
+
+    lines = ["%d %d %d %d" % (node_count, len(edges), len(constraints), len(demands))]
+    lines.extend("%d %d %d %d %d %d" % edge for edge in edges)
+    lines.extend("%d %d %d" % constraint for constraint in constraints)
+    lines.extend("%d %d %d %d" % demand for demand in demands)
+    return "\n".join(lines) + "\n"
+
+if __name__ == "__main__":
+    # python generator.py <topology> <node_count> [seed]
+    topology, node_count = sys.argv[1], int(sys.argv[2])
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    sys.stdout.write(generate_instance(topology, node_count, seed))
@@ -1,218 +1,766 @@
 from Instance import Instance
+from array import array
 from collections import deque
 from Flow import Flow
+from Demand import Demand
+from Deadline import Deadline
+from FeasibilityIndex import FeasibilityIndex
+from BundleIndex import BundleIndex
+from IndexedHeap import IndexedHeap
+from Landmarks import Landmarks
+from ordering import order_demands
+from PathCache import PathCache
+from HopIndex import HopIndex
+from SearchStats import SearchStats
 import time
-from itertools import combinations, chain, product
 
 class Solver():
-    def __init__(self, instance):
+    def __init__(self, instance, hop_depth = 2, writer = None, stats = False, landmarks = None):
         self.instance = instance
-        self.cache = {}
+        # Optional FlowWriter kept in sync with the committed flows
+        self.writer = writer
+        self.cache = PathCache(instance)
+        # Neighborhoods of destinations, to finish a BFS as soon as it gets within hop_depth hops
+        self.hops = HopIndex(instance, hop_depth)
+        # Committed paths are only cached while the cache-reading BFS engine is in use
+        self.cache_paths = False
+        self.feasibility = FeasibilityIndex(instance)
+        # Parallel edges of each bundle ordered by residual capacity and by distance
+        self.bundles = BundleIndex(instance, self.feasibility)
+        # A node is visited by the current search when its stamp equals search_stamp
+        self.visited = array('i', [0]) * instance.node_count
+        self.search_stamp = 0
+        # BFS tree of the current search: predecessor and incoming edge of each visited node
+        self.parent_node = array('i', [-1]) * instance.node_count
+        self.parent_edge = array('i', [-1]) * instance.node_count
+        # Backward tree of the bidirectional search, grown from the destination
+        self.visited_back = array('i', [0]) * instance.node_count
+        self.parent_node_back = array('i', [-1]) * instance.node_count
+        self.parent_edge_back = array('i', [-1]) * instance.node_count
+        # Shared search tree of a demand batch, kept apart so fallback searches don't clobber it
+        self.tree_visited = array('i', [0]) * instance.node_count
+        self.tree_parent_node = array('i', [-1]) * instance.node_count
+        self.tree_parent_edge = array('i', [-1]) * instance.node_count
+        # Mixed-state search: state n < node_count is node n, and at constrained nodes
+        # state node_count + 2*e means e was walked start -> end, node_count + 2*e+1 end -> start
+        state_count = instance.node_count + 2 * instance.edge_count
+        self.heap = IndexedHeap(state_count)
+        self.parent_state = array('i', [-1]) * state_count
+        self.state_edge = array('i', [-1]) * state_count
+        self.state_dist = array('q', [0]) * state_count
+        # Edge weights of the "capacity" and "hops" searches. Residual capacities never
+        # exceed the initial ones, so the initial maximum stays a valid scale.
+        self.capacity_scale = max(instance.edge_capacity) + 1 if instance.edge_count else 1
+        self.hop_distance = array('b', [1]) * instance.edge_count
+        # A* landmarks, best built right after read_instance and passed in so their
+        # tables are not computed inside the routing budget. Otherwise solve builds
+        # them on first use. Heuristic values are cached per node for the current search.
+        self.landmarks = landmarks
+        self.estimate_value = array('q', [0]) * instance.node_count
+        self.estimate_stamp = array('i', [0]) * instance.node_count
+        # BFS engines only expand the first neighbor_limit neighbors of a node (highest degree first)
+        self.neighbor_limit = None
+        # Smallest batch worth a shared search tree, smaller ones are routed one by one
+        self.min_batch = 8
+        # Committed flows by flow_id, the flow ids through each node, and an undo log
+        # of (committed, flow) entries used to roll back rip-up-and-reroute moves
+        self.flows = {}
+        self.node_flows = {}
+        self.journal = []
+        # Search counters, None unless asked for
+        self.stats = SearchStats(instance, self.feasibility, self.cache) if stats else None
 
-    def get_from_cache(self, demand):
-        i, j = [demand.start_id, demand.end_id].sort()
-        path = self.cache[(i, j)]
-        first_edge = self.instance.edges_list[path[0]]
-        
-        if first_edge.start_id == demand.start_id:
-            return path
-        else:
-            return path[::-1]
-    
-    def in_cache(self, node_ids):
-        i, j = min(node_ids), max(node_ids)
-        return (i, j) in self.cache
-
-    def put_in_cache(self, demand, path):
-        n_id = demand.start_id
-        n = self.instance.nodes_list[n_id]
-        nodes = [n]
-        for edge_id in path:
-            edge = self.instance.edges_list[edge_id]
-            n_id = n.next_node(edge)
-            n = self.instance.nodes_list[n_id]
-            nodes.append(n)
-
-        ## add all pairs of nodes if one node is final
-        final_nodes = []
-        other_nodes = []
-        for i in range(len(nodes)):
-            node = nodes[i]
-            if nodes[i].is_final:
-                final_nodes.append((i, node))
-            else:
-                other_nodes.append((i, node))
+    def next_node(self, node_id, edge_id):
+        start_id = self.instance.edge_start[edge_id]
+        return start_id if node_id != start_id else self.instance.edge_end[edge_id]
 
-        #add all pairs of (final_node1, final_node2) to cache
-        #add all pairs of one non_final and one final to cache
-        for s, d in chain(combinations(final_nodes, 2), product(final_nodes, other_nodes)):
-            s_index, s_node = s 
-            d_index, d_node = d
-            path_to_cache = path[s_index:d_index] + path[d_index:s_index]
+    def trace_path(self, node_id, parent_node = None, parent_edge = None):
+        # Edge ids from the search source to node_id, following the parent pointers
+        parent_node = parent_node or self.parent_node
+        parent_edge = parent_edge or self.parent_edge
+        path = []
+        while parent_edge[node_id] >= 0:
+            path.append(parent_edge[node_id])
+            node_id = parent_node[node_id]
+        path.reverse()
+        return path
 
-            self.add_to_cache((s_node.node_id, d_node.node_id), path_to_cache)
+    def snapshot(self):
+        # Residual state and its feasibility index, to try alternatives and roll back
+        return (self.instance.snapshot(), self.feasibility.snapshot(), self.bundles.snapshot(),
+            dict(self.flows))
 
-    def add_to_cache(self, node_ids, path):
-        i, j = min(node_ids), max(node_ids)
-        
-        if i == node_ids[0]:
-            self.cache[(i, j)] = path
-        else:
-            self.cache[(i, j)] = path[::-1]
-    
-    def solve(self, tic, criteria = "max_cap", order = None, time_limit=1.9):
+    def restore(self, snapshot):
+        instance_snapshot, feasibility_snapshot, bundles_snapshot, flows = snapshot
+        self.instance.restore(instance_snapshot)
+        self.feasibility.restore(feasibility_snapshot)
+        self.bundles.restore(bundles_snapshot)
+        # Residuals changed without bumping edge versions, no entry can be trusted
+        self.cache.clear()
+        self.flows = dict(flows)
+        self.node_flows = {}
+        if self.writer is not None:
+            self.writer.clear()
+        for flow in self.flows.values():
+            for node_id in self.path_nodes(flow):
+                self.node_flows.setdefault(node_id, set()).add(flow.flow_id)
+            if self.writer is not None:
+                self.writer.add(flow)
+        self.journal = []
+
+    def solve(self, tic, criteria = "max_cap", order = None, time_limit=1.9, bidirectional = False,
+            weight = "distance", neighbor_limit = None, improve = False, batch = False, seed = None):
         
-        flows_list = []
-    
+        rejected = []
+        deadline = Deadline(time_limit, tic)
+        self.neighbor_limit = neighbor_limit
         
+        # order=True keeps the historical ascending flow rate, a string picks a strategy
         if order:
-            sorted_demands = sorted(self.instance.demands_list,
-                key= lambda d: d.flow_rate, reverse=False)
+            sorted_demands = order_demands(self.instance, self.instance.demands_list,
+                "flow_rate" if order is True else order, seed=seed, landmarks=self.landmarks)
         else:
             sorted_demands = self.instance.demands_list
     
-        for demand in sorted_demands:
-            if time.time() - tic < time_limit:
-                flow = self.get_path_bfs(demand, tic, time_limit, criteria=criteria)
+        if criteria == "astar" and weight == "capacity":
+            # Landmark bounds only exist for distance and hops, search without them
+            criteria = "dijkstra"
+        if criteria == "dijkstra":
+            get_path = lambda demand, deadline, criteria: \
+                self.get_path_dijkstra(demand, deadline, weight=weight)
+        elif criteria == "astar":
+            if self.landmarks is None or self.landmarks.weight != weight:
+                self.landmarks = Landmarks(self.instance, weight=weight)
+            get_path = lambda demand, deadline, criteria: \
+                self.get_path_dijkstra(demand, deadline, weight=weight, landmarks=self.landmarks)
+        elif bidirectional:
+            get_path = self.get_path_bidirectional
+        else:
+            get_path = self.get_path_bfs
+        self.cache_paths = get_path == self.get_path_bfs
+
+        if batch:
+            batches = self.batch_demands(sorted_demands)
+        else:
+            batches = [(demand.start_id, [demand]) for demand in sorted_demands]
+        demands_left = len(sorted_demands)
+        stats = self.stats
+        for root, demands in batches:
+            if deadline.expired():
+                break
+            deadline.start_demand(max(demands_left // len(demands), 1))
+            demands_left -= len(demands)
+            shared = len(demands) >= self.min_batch
+            if shared:
+                self.grow_tree(root, demands, deadline, criteria)
+            for demand in demands:
+                if stats is not None:
+                    started = time.perf_counter_ns()
+                flow = self.path_from_tree(root, demand) if shared else None
+                if flow is None:
+                    flow = get_path(demand, deadline, criteria=criteria)
                 if flow and self.check_path(flow):
-                    flows_list.append(flow)
-                    self.update_graph(flow)
+                    self.commit_flow(flow)
+                else:
+                    flow = None
+                    rejected.append(demand)
+                if stats is not None:
+                    stats.add_demand(demand, time.perf_counter_ns() - started, flow is not None)
+
+        if improve:
+            self.improve(rejected, deadline, get_path, criteria)
+        self.journal = []
+        return list(self.flows.values())
+
+    def batch_demands(self, demands):
+        # Group demands by a shared endpoint, the busier of their two endpoints, in order
+        # of first appearance. Groups below min_batch are given back as single demands,
+        # in place.
+        count = {}
+        for demand in demands:
+            count[demand.start_id] = count.get(demand.start_id, 0) + 1
+            count[demand.end_id] = count.get(demand.end_id, 0) + 1
+        batches = {}
+        for demand in demands:
+            root = demand.start_id if count[demand.start_id] >= count[demand.end_id] else demand.end_id
+            batches.setdefault(root, []).append(demand)
+        result = []
+        for root, group in batches.items():
+            if len(group) >= self.min_batch:
+                result.append((root, group))
             else:
-                break
-        
-        x = 0
-        if len(flows_list) == 0:
-            while True:
-                x += 1
-    
-        return flows_list
+                result.extend((demand.start_id, [demand]) for demand in group)
+        return result
+
+    def grow_tree(self, root, demands, deadline, criteria):
+        # BFS tree from root over the edges that can carry every demand of a batch,
+        # grown until all their other endpoints are reached
+        instance = self.instance
+        node_alive = self.feasibility.node_alive
+        node_offsets = instance.node_offsets
+        adj_nodes = instance.adj_nodes
+        neighbor_limit = self.neighbor_limit or instance.node_count
+        visited = self.tree_visited
+        parent_node = self.tree_parent_node
+        parent_edge = self.tree_parent_edge
+        self.search_stamp += 1
+        stamp = self.search_stamp
+        self.tree_stamp = stamp
+        if not node_alive[root]:
+            return
+        probe = Demand(-1, root, root, min(demand.flow_rate for demand in demands))
+        targets = {demand.end_id if demand.start_id == root else demand.start_id for demand in demands}
+        targets.discard(root)
+        left = len(targets)
+        stats = self.stats
+
+        queue = deque([root])
+        visited[root] = stamp
+        parent_edge[root] = -1
+        countdown = deadline.check_every
+        while queue and left:
+            countdown -= 1
+            if countdown == 0:
+                if deadline.demand_expired():
+                    break
+                countdown = deadline.check_every
+
+            n = queue.popleft()
+            if stats is not None:
+                stats.pop(node_offsets[n], min(node_offsets[n + 1], node_offsets[n] + neighbor_limit))
+            prev_edge = parent_edge[n]
+            for slot in range(node_offsets[n], min(node_offsets[n + 1], node_offsets[n] + neighbor_limit)):
+                i = adj_nodes[slot]
+                if node_alive[i] and visited[i] != stamp:
+                    chosen_edge = self.choose_edge_bfs(slot, probe, prev_edge, criteria = criteria)
+                    if chosen_edge >= 0:
+                        queue.append(i)
+                        visited[i] = stamp
+                        parent_node[i] = n
+                        parent_edge[i] = chosen_edge
+                        if i in targets:
+                            left -= 1
+
+    def path_from_tree(self, root, demand):
+        # Peel the demand's path off the batch tree, None when it is not (or no longer) usable
+        other = demand.end_id if demand.start_id == root else demand.start_id
+        if other == root or self.tree_visited[other] != self.tree_stamp:
+            return None
+        path = self.trace_path(other, self.tree_parent_node, self.tree_parent_edge)
+        if root != demand.start_id:
+            path.reverse()
+        flow = Flow(demand, path)
+        return flow if self.check_path(flow) else None
+
+    def improve(self, rejected, deadline, get_path, criteria, max_victims = 2):
+        # Rip-up and reroute: admit rejected demands by removing a few smaller flows
+        # through their endpoints and rerouting them, until the deadline or a pass
+        # makes no progress
+        demands = {demand.demand_id: demand for demand in self.instance.demands_list}
+        pending = sorted(rejected, key= lambda d: d.flow_rate, reverse=True)
+        progress = True
+        while pending and progress and not deadline.expired():
+            progress = False
+            still_pending = []
+            for k, demand in enumerate(pending):
+                if deadline.expired():
+                    still_pending.extend(pending[k:])
+                    break
+                deadline.start_demand(len(pending) - k)
+                dropped = self.reroute(demand, demands, deadline, get_path, criteria, max_victims)
+                if dropped is None:
+                    still_pending.append(demand)
+                else:
+                    progress = True
+                    still_pending.extend(dropped)
+            pending = still_pending
+
+    def reroute(self, demand, demands, deadline, get_path, criteria, max_victims):
+        # Returns the demands dropped to admit this one, or None when the move is rolled back
+        mark = len(self.journal)
+        flow = get_path(demand, deadline, criteria=criteria)
+        if flow and self.check_path(flow):
+            self.commit_flow(flow)
+            return []
+
+        victims = set()
+        for node_id in (demand.start_id, demand.end_id):
+            victims.update(self.node_flows.get(node_id, ()))
+        victims = sorted((self.flows[flow_id] for flow_id in victims
+            if self.flows[flow_id].flow_rate < demand.flow_rate), key= lambda f: f.flow_rate)
+        if not victims:
+            return None
+        victims = victims[:max_victims]
+
+        for victim in victims:
+            self.release_flow(victim)
+        flow = get_path(demand, deadline, criteria=criteria)
+        if not flow or not self.check_path(flow):
+            self.rollback(mark)
+            return None
+        self.commit_flow(flow)
+
+        gain = demand.flow_rate
+        dropped = []
+        for victim in victims:
+            victim_demand = demands[victim.flow_id]
+            flow = get_path(victim_demand, deadline, criteria=criteria)
+            if flow and self.check_path(flow):
+                self.commit_flow(flow)
+            else:
+                gain -= victim.flow_rate
+                dropped.append(victim_demand)
+        if gain <= 0:
+            self.rollback(mark)
+            return None
+        del self.journal[mark:]
+        return dropped
+
+    def path_nodes(self, flow):
+        node_id = flow.start_id
+        nodes = [node_id]
+        for edge_id in flow.edge_ids:
+            node_id = self.next_node(node_id, edge_id)
+            nodes.append(node_id)
+        return nodes
+
+    def commit_flow(self, flow):
+        self.update_graph(flow)
+        self.flows[flow.flow_id] = flow
+        nodes = self.path_nodes(flow)
+        for node_id in nodes:
+            self.node_flows.setdefault(node_id, set()).add(flow.flow_id)
+        if self.cache_paths:
+            self.cache.add_path(nodes, flow.edge_ids)
+        if self.writer is not None:
+            self.writer.add(flow)
+        self.journal.append((True, flow))
+
+    def release_flow(self, flow):
+        # Inverse of commit_flow
+        instance = self.instance
+        edge_capacity = instance.edge_capacity
+        edge_group = instance.edge_group
+        group_GFL = instance.group_GFL
+        node_SFL = instance.node_SFL
+        for node_id in self.path_nodes(flow):
+            node_SFL[node_id] += 1
+            self.node_flows[node_id].discard(flow.flow_id)
+        for edge_id in flow.edge_ids:
+            edge_capacity[edge_id] += flow.flow_rate
+            group_GFL[edge_group[edge_id]] += 1
+        self.feasibility.release(flow)
+        self.bundles.update(flow.edge_ids)
+        self.cache.touch(flow.edge_ids)
+        del self.flows[flow.flow_id]
+        if self.writer is not None:
+            self.writer.remove(flow)
+        self.journal.append((False, flow))
+
+    def rollback(self, mark):
+        # Undo the journal entries past mark, newest first
+        while len(self.journal) > mark:
+            committed, flow = self.journal.pop()
+            if committed:
+                self.release_flow(flow)
+            else:
+                self.commit_flow(flow)
+            self.journal.pop()
 
     def update_graph(self, flow):
+        instance = self.instance
+        edge_capacity = instance.edge_capacity
+        edge_group = instance.edge_group
+        group_GFL = instance.group_GFL
+        node_SFL = instance.node_SFL
         node_id = flow.start_id
-        edge_ids = flow.edge_ids
         #update first node SFL
-        node = self.instance.nodes_list[node_id]
-        node.decrease_SFL()
-        for edge_id in edge_ids:
+        node_SFL[node_id] -= 1
+        for edge_id in flow.edge_ids:
             #update edge capacity
-            edge = self.instance.edges_list[edge_id]
-            edge.update_capacity(flow.flow_rate)
+            edge_capacity[edge_id] -= flow.flow_rate
             #update group GFL
-            self.instance.groups[edge.group_id].update_GFL()
+            group_GFL[edge_group[edge_id]] -= 1
             #get next node
-            next_node_id = node.next_node(edge)
-            node = self.instance.nodes_list[next_node_id]
+            node_id = self.next_node(node_id, edge_id)
             #update node SFL
-            node.decrease_SFL()
+            node_SFL[node_id] -= 1
+        self.feasibility.commit(flow)
+        self.bundles.update(flow.edge_ids)
+        self.cache.touch(flow.edge_ids)
 
     def check_path(self, flow):
-        prev_edge = None
-        for edge_id in flow.edge_ids:
-            edge = self.instance.edges_list[edge_id]
-
-            # Check capacity
-            if flow.flow_rate > edge.capacity:
-                return False
+        if self.feasibility.is_feasible(flow):
+            return True
+        if self.stats is not None:
+            self.stats.check_failures += 1
+        return False
 
-            # Check GFL
-            if self.instance.groups[edge.group_id].GFL <= 0:
-                return False
+    def get_path_bfs(self, demand, deadline, criteria = "max_cap"):
 
-            # Check SFL
-            if self.instance.nodes_list[edge.start_id].SFL <= 0:
-                return False
-            if self.instance.nodes_list[edge.end_id].SFL <= 0:
-                return False
+        instance = self.instance
+        node_alive = self.feasibility.node_alive
+        node_offsets = instance.node_offsets
+        adj_nodes = instance.adj_nodes
+        neighbor_limit = self.neighbor_limit or instance.node_count
+        cache = self.cache
+        bundle_max = self.bundles.bundle_max
+        flow_rate = demand.flow_rate
+        stats = self.stats
 
-            # Check constrained
-            if prev_edge and edge.is_constrained(prev_edge):
-                return False
-
-            prev_edge = edge
-        
-        return True
-
-    def get_path_bfs(self, demand, tic, time_limit, criteria = "max_cap"):
-
-        if self.instance.nodes_list[demand.start_id].SFL <= 0:
+        if not node_alive[demand.start_id]:
             return None
-        visited = set() 
+        visited = self.visited
+        parent_node = self.parent_node
+        parent_edge = self.parent_edge
+        self.search_stamp += 1
+        stamp = self.search_stamp
+        near_stamp = self.hops.near_stamp
+        near = self.hops.mark(demand.end_id)
         queue= deque()
   
         # Mark the source node as visited and enqueue it
-        queue.append((demand.start_id, []))
-        visited.add(demand.start_id)
-        while queue and (time.time() - tic < time_limit):
+        queue.append(demand.start_id)
+        visited[demand.start_id] = stamp
+        parent_edge[demand.start_id] = -1
+        countdown = deadline.check_every
+        while queue:
+            countdown -= 1
+            if countdown == 0:
+                if deadline.demand_expired():
+                    break
+                countdown = deadline.check_every
  
             #Dequeue a vertex from queue
-            n, cur_path = queue.popleft()
+            n = queue.popleft()
+            if stats is not None:
+                stats.pop(node_offsets[n], min(node_offsets[n + 1], node_offsets[n] + neighbor_limit))
             
             #check cache
-            if self.in_cache((n, demand.end_id)):
-                concat_path = cur_path + self.get_from_cache((n, demand.end_id))
-                flow = Flow(demand, concat_path)
+            cached_path = cache.get(n, demand.end_id)
+            if cached_path is not None:
+                flow = Flow(demand, self.trace_path(n) + cached_path)
                 if self.check_path(flow):
                     return flow  
+                if stats is not None:
+                    stats.cache_invalid += 1
             
             # If this adjacent node is the destination node,
             # then return true
             if n == demand.end_id:
-                flow = Flow(demand, cur_path)
-                self.put_in_cache(demand, cur_path)
-                return flow
+                return Flow(demand, self.trace_path(n))
+
+            # Within a few hops of the destination, try to walk straight in
+            if near_stamp[n] == near:
+                flow = self.complete_path(n, demand, criteria)
+                if flow:
+                    return flow
 
             #  Else, continue to do BFS
-            for i in self.instance.nodes_list[n].neighbors:
-                
-                if i not in visited and self.instance.nodes_list[i].SFL > 0:
-                    edges_n_i = self.instance.nodes_list[n].neighbors[i]
-                    #print(cur_path)
-                    prev_edge = self.instance.edges_list[cur_path[-1]] if len(cur_path) else None
-                    chosen_edge = self.choose_edge_bfs(edges_n_i, demand,
+            prev_edge = parent_edge[n]
+            for slot in range(node_offsets[n], min(node_offsets[n + 1], node_offsets[n] + neighbor_limit)):
+                i = adj_nodes[slot]
+                if node_alive[i] and visited[i] != stamp:
+                    if bundle_max[slot] < flow_rate:
+                        if stats is not None:
+                            stats.reject_bundle(slot)
+                        continue
+                    chosen_edge = self.choose_edge_bfs(slot, demand,
                         prev_edge, criteria = criteria)
 
-                    if chosen_edge:
-                        new_path = cur_path.copy()
-                        new_path.append(chosen_edge.edge_id)
-                        queue.append((i, new_path))
-                        visited.add(i)
+                    if chosen_edge >= 0:
+                        queue.append(i)
+                        visited[i] = stamp
+                        parent_node[i] = n
+                        parent_edge[i] = chosen_edge
         # If BFS is complete without visited d
         return None
-    
-    def choose_edge_bfs(self, edges, demand, prev_edge, criteria = "min_dist"):
 
-        possible_edges = []
-        min_dist_edge = None 
-        max_capacity_edge = None
-        last_edge = None
-        for edge in edges:
-            
-            # Verify constraint
-            if prev_edge and edge.is_constrained(prev_edge):
-                continue
+    def complete_path(self, n, demand, criteria):
+        # Walk from n into the destination along the marked hop neighborhood
+        instance = self.instance
+        near_slot = self.hops.near_slot
+        path = self.trace_path(n)
+        prev_edge = self.parent_edge[n]
+        while n != demand.end_id:
+            slot = near_slot[n]
+            chosen_edge = self.choose_edge_bfs(slot, demand, prev_edge, criteria = criteria)
+            if chosen_edge < 0:
+                return None
+            path.append(chosen_edge)
+            prev_edge = chosen_edge
+            n = instance.adj_nodes[slot]
+        flow = Flow(demand, path)
+        return flow if self.check_path(flow) else None
+
+    def get_path_bidirectional(self, demand, deadline, criteria = "max_cap"):
+
+        instance = self.instance
+        node_alive = self.feasibility.node_alive
+        node_offsets = instance.node_offsets
+        adj_nodes = instance.adj_nodes
+        neighbor_limit = self.neighbor_limit or instance.node_count
+
+        if not node_alive[demand.start_id] or not node_alive[demand.end_id]:
+            return None
+        self.search_stamp += 1
+        stamp = self.search_stamp
+        bundle_max = self.bundles.bundle_max
+        flow_rate = demand.flow_rate
+        stats = self.stats
+
+        # side 0 grows from the source, side 1 from the destination
+        trees = (
+            (self.visited, self.parent_node, self.parent_edge, deque([demand.start_id])),
+            (self.visited_back, self.parent_node_back, self.parent_edge_back, deque([demand.end_id])),
+        )
+        for root, (visited, parent_node, parent_edge, queue) in zip((demand.start_id, demand.end_id), trees):
+            visited[root] = stamp
+            parent_edge[root] = -1
+
+        countdown = deadline.check_every
+        while trees[0][3] and trees[1][3]:
+            # Always expand one whole layer of the smaller frontier
+            side = 0 if len(trees[0][3]) <= len(trees[1][3]) else 1
+            visited, parent_node, parent_edge, queue = trees[side]
+            other_visited, _, other_parent_edge, _ = trees[1 - side]
+
+            for _ in range(len(queue)):
+                countdown -= 1
+                if countdown == 0:
+                    if deadline.demand_expired():
+                        return None
+                    countdown = deadline.check_every
+
+                n = queue.popleft()
+                if stats is not None:
+                    stats.pop(node_offsets[n], min(node_offsets[n + 1], node_offsets[n] + neighbor_limit))
+                prev_edge = parent_edge[n]
+                for slot in range(node_offsets[n], min(node_offsets[n + 1], node_offsets[n] + neighbor_limit)):
+                    i = adj_nodes[slot]
+                    if not node_alive[i] or visited[i] == stamp:
+                        continue
+                    if bundle_max[slot] < flow_rate:
+                        if stats is not None:
+                            stats.reject_bundle(slot)
+                        continue
+
+                    if other_visited[i] == stamp:
+                        # Meeting point: the edge must also be allowed next to the
+                        # edge the other tree uses at i
+                        chosen_edge = self.choose_edge_bfs(slot, demand, prev_edge,
+                            criteria = criteria, next_edge = other_parent_edge[i])
+                        if chosen_edge >= 0:
+                            return self.join_paths(demand, n, i, chosen_edge, side)
+                        continue
+
+                    chosen_edge = self.choose_edge_bfs(slot, demand,
+                        prev_edge, criteria = criteria)
+                    if chosen_edge >= 0:
+                        queue.append(i)
+                        visited[i] = stamp
+                        parent_node[i] = n
+                        parent_edge[i] = chosen_edge
+
+        return None
+
+    def get_path_dijkstra(self, demand, deadline, weight = "distance", landmarks = None):
+        # Shortest path over node states, except at constrained nodes where the state is
+        # (node, incoming edge), so forbidden edge pairs are honored exactly while the
+        # rest of the graph is searched once per node. weight is "distance", "hops" or "capacity" (prefers large
+        # residuals). With landmarks the search is A*, guided by their lower bounds.
+        instance = self.instance
+        node_alive = self.feasibility.node_alive
+        edge_bucket = self.feasibility.edge_bucket
+        node_offsets = instance.node_offsets
+        adj_nodes = instance.adj_nodes
+        bundle_offsets = instance.bundle_offsets
+        adj_edges = instance.adj_edges
+        edge_start = instance.edge_start
+        edge_end = instance.edge_end
+        edge_capacity = instance.edge_capacity
+        edge_distance = instance.edge_distance
+        node_constrained = instance.node_constrained
+        node_count = instance.node_count
+        parent_state = self.parent_state
+        state_edge = self.state_edge
+        state_dist = self.state_dist
+        heap = self.heap
+        bundle_max = self.bundles.bundle_max
+        stats = self.stats
+        start_id, end_id = demand.start_id, demand.end_id
+        flow_rate = demand.flow_rate
+        need = flow_rate.bit_length()
+        by_capacity = weight == "capacity"
+        scale = self.capacity_scale
+        if weight == "hops":
+            edge_distance = self.hop_distance
+
+        if not node_alive[start_id] or not node_alive[end_id]:
+            return None
 
-            #Verify group gfl
-            if self.instance.groups[edge.group_id].GFL <= 0:
-                continue 
+        if landmarks is not None:
+            target_row = landmarks.target_row(end_id)
+            if landmarks.estimate(start_id, target_row) < 0:
+                return None
+            estimate_value = self.estimate_value
+            estimate_stamp = self.estimate_stamp
+            self.search_stamp += 1
+            stamp = self.search_stamp
 
-            # Verify edge capacity
-            if edge.can_add_demand(demand):
-                possible_edges.append(edge)
-                last_edge = edge
+        # The source is always a node state, nothing came before it
+        heap.clear()
+        heap.push(start_id, 0)
+        parent_state[start_id] = -1
+        state_edge[start_id] = -1
+        state_dist[start_id] = 0
+        countdown = deadline.check_every
+        while len(heap):
+            countdown -= 1
+            if countdown == 0:
+                if deadline.demand_expired():
+                    return None
+                countdown = deadline.check_every
 
-                if not min_dist_edge or edge.distance < min_dist_edge.distance:
-                    min_dist_edge = edge 
+            state, _ = heap.pop()
+            dist = state_dist[state]
+            if state < node_count:
+                n = state
+            else:
+                prev_edge = (state - node_count) >> 1
+                n = edge_start[prev_edge] if state & 1 else edge_end[prev_edge]
 
-                if not max_capacity_edge or edge.capacity > max_capacity_edge.capacity:
-                    max_capacity_edge = edge
+            if n == end_id:
+                path = []
+                while parent_state[state] >= 0:
+                    path.append(state_edge[state])
+                    state = parent_state[state]
+                path.reverse()
+                flow = Flow(demand, path)
+                if self.check_path(flow):
+                    return flow
+                # The state graph allows revisiting a node, fall back to plain BFS
+                return self.get_path_bfs(demand, deadline, criteria="min_dist")
+
+            if stats is not None:
+                stats.pop(node_offsets[n], node_offsets[n + 1])
+            constrained = instance.node_peers(n, prev_edge) if state >= node_count else None
+            for slot in range(node_offsets[n], node_offsets[n + 1]):
+                i = adj_nodes[slot]
+                if not node_alive[i] or i == start_id:
+                    continue
+                if bundle_max[slot] < flow_rate:
+                    if stats is not None:
+                        stats.reject_bundle(slot)
+                    continue
+                estimate = 0
+                if landmarks is not None:
+                    if estimate_stamp[i] != stamp:
+                        estimate_value[i] = landmarks.estimate(i, target_row)
+                        estimate_stamp[i] = stamp
+                    estimate = estimate_value[i]
+                    if estimate < 0:
+                        continue
+                for k in range(bundle_offsets[slot], bundle_offsets[slot + 1]):
+                    edge_id = adj_edges[k]
+                    if edge_bucket[edge_id] < need or edge_capacity[edge_id] < flow_rate:
+                        if stats is not None:
+                            stats.reject_edge(edge_id)
+                        continue
+                    if constrained and edge_id in constrained:
+                        if stats is not None:
+                            stats.rejections["constraint"] += 1
+                        continue
+                    if node_constrained[i]:
+                        next_state = node_count + (2 * edge_id if edge_start[edge_id] == n else 2 * edge_id + 1)
+                    else:
+                        next_state = i
+                    if by_capacity:
+                        next_dist = dist + scale // edge_capacity[edge_id]
+                    else:
+                        next_dist = dist + edge_distance[edge_id]
+                    if heap.push(next_state, next_dist + estimate):
+                        parent_state[next_state] = state
+                        state_edge[next_state] = edge_id
+                        state_dist[next_state] = next_dist
+
+        return None
+
+    def join_paths(self, demand, n, i, edge_id, side):
+        # Source -> meeting edge -> destination, with n on the tree of the given side
+        if side == 1:
+            n, i = i, n
+        path = self.trace_path(n)
+        path.append(edge_id)
+        parent_node_back = self.parent_node_back
+        parent_edge_back = self.parent_edge_back
+        while parent_edge_back[i] >= 0:
+            path.append(parent_edge_back[i])
+            i = parent_node_back[i]
+        return Flow(demand, path)
+    
+    def choose_edge_bfs(self, slot, demand, prev_edge, criteria = "min_dist", next_edge = -1):
 
-                if criteria == "first_found":
-                    return last_edge
+        instance = self.instance
+        edge_capacity = instance.edge_capacity
+        edge_bucket = self.feasibility.edge_bucket
+        bundles = self.bundles
+        stats = self.stats
+        flow_rate = demand.flow_rate
 
-        if criteria == "min_dist":
-            return min_dist_edge
-        elif criteria == "max_cap":
-            return max_capacity_edge
+        # No usable edge of the bundle is wide enough
+        if bundles.bundle_max[slot] < flow_rate:
+            if stats is not None:
+                stats.reject_bundle(slot)
+            return -1
+
+        # Forbidden pairs apply at a node: prev_edge's at the node of the slot, next_edge's
+        # at the neighbor i, and only edges with some constraint need the lookup
+        edge_constrained = instance.edge_constrained
+        node_constrained = instance.node_constrained
+        i = instance.adj_nodes[slot]
+        constrained = next_constrained = None
+        if prev_edge >= 0 and edge_constrained[prev_edge]:
+            edge_id = instance.adj_edges[instance.bundle_offsets[slot]]
+            n = instance.edge_start[edge_id] + instance.edge_end[edge_id] - i
+            if node_constrained[n]:
+                constrained = instance.node_peers(n, prev_edge)
+        if next_edge >= 0 and edge_constrained[next_edge] and node_constrained[i]:
+            next_constrained = instance.node_peers(i, next_edge)
+        need = flow_rate.bit_length()
+
+        # Walk the bundle in the order of the criteria, the first edge that passes is the
+        # best one. By decreasing residual, the first edge too narrow ends the bundle.
+        lo, hi = instance.bundle_offsets[slot], instance.bundle_offsets[slot + 1]
+        by_residual = criteria == "max_cap"
+        if by_residual:
+            if hi - lo > 1 and not bundles.residual_sorted[slot]:
+                bundles.sort_by_residual(slot)
+            order = bundles.by_residual
+        elif criteria == "min_dist":
+            if hi - lo > 1 and not bundles.distance_sorted[slot]:
+                bundles.sort_by_distance(slot)
+            order = bundles.by_distance
         else:
-            return None if len(possible_edges) == 0 else possible_edges[0]
-        
+            order = instance.adj_edges
+        for k in range(lo, hi):
+            edge_id = order[k]
+
+            # Skip dead edges and edges without the capacity, this also covers
+            # saturated groups
+            if edge_bucket[edge_id] < need or edge_capacity[edge_id] < flow_rate:
+                if stats is not None:
+                    stats.reject_edge(edge_id)
+                if by_residual:
+                    break
+                continue
+
+            # Verify constraint
+            if (constrained and edge_id in constrained) or (next_constrained and edge_id in next_constrained):
+                if stats is not None:
+                    stats.rejections["constraint"] += 1
+                continue
+
+            return edge_id
+
+        return -1
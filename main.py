@@ -1,15 +1,40 @@
 from heuristics import Solver
 from reader import read_instance
-from writer import write_flows
+from FlowWriter import FlowWriter
+from Profiler import Profiler
+from anytime import install_anytime, cancel_anytime
+from contextlib import nullcontext
 from Flow import Flow
+import os
+import time
 
-instance = read_instance(path="data/input.txt")
+tic = time.time()
+# ROUTING_PROFILE=- reports phase timings and memory peaks on stderr, any other value is a file
+profile_target = os.environ.get("ROUTING_PROFILE")
+profiler = Profiler() if profile_target else None
+phase = profiler.phase if profiler is not None else lambda name: nullcontext()
 
-solver = Solver(instance)
+instance = read_instance(path="data/input.txt", profiler=profiler)
+
+writer = FlowWriter()
+with phase("build_index"):
+    solver = Solver(instance, writer=writer)
+install_anytime(writer, hard_limit=1.95, tic=tic)
 
 print(instance.groups[instance.edges_list[0].group_id].GFL)
 
-flows = solver.solve( criteria="min_dist", order=False)
-write_flows(flows)
+with phase("routing"):
+    flows = solver.solve(tic, criteria="min_dist", order=False)
+cancel_anytime()
+with phase("output"):
+    writer.flush()
+
+print(instance.groups[instance.edges_list[0].group_id].GFL)
 
-print(instance.groups[instance.edges_list[0].group_id].GFL)
\ No newline at end of file
+if profiler is not None:
+    profiler.stop()
+    if profile_target == "-":
+        profiler.report()
+    else:
+        with open(profile_target, "w") as f:
+            profiler.report(f)
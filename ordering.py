@@ -0,0 +1,54 @@
+from Landmarks import Landmarks
+import random
+
+def node_bottleneck(instance, node_id):
+    # Largest residual capacity among the edges at node_id
+    edge_capacity = instance.edge_capacity
+    adj_edges = instance.adj_edges
+    begin = instance.bundle_offsets[instance.node_offsets[node_id]]
+    end = instance.bundle_offsets[instance.node_offsets[node_id + 1]]
+    return max((edge_capacity[adj_edges[k]] for k in range(begin, end)), default=0)
+
+def demand_estimates(instance, demands, landmarks = None):
+    # Cheap per-demand cost model: hop lower bound from hop landmarks (node_count when
+    # unreachable), degree of the scarcer endpoint, bottleneck capacity at the endpoints
+    if landmarks is None or landmarks.weight != "hops":
+        landmarks = Landmarks(instance, count=2, weight="hops")
+    node_offsets = instance.node_offsets
+    bottlenecks = {}
+    hops, degree, bottleneck = [], [], []
+    for demand in demands:
+        s, t = demand.start_id, demand.end_id
+        estimate = landmarks.estimate(s, landmarks.target_row(t))
+        hops.append(max(estimate, 1) if estimate >= 0 else instance.node_count)
+        degree.append(min(node_offsets[s + 1] - node_offsets[s], node_offsets[t + 1] - node_offsets[t]))
+        for n in (s, t):
+            if n not in bottlenecks:
+                bottlenecks[n] = node_bottleneck(instance, n)
+        bottleneck.append(min(bottlenecks[s], bottlenecks[t]))
+    return {"hops": hops, "degree": degree, "bottleneck": bottleneck}
+
+# Sort keys, ascending, as (demand, estimates, index of the demand) -> key
+ORDERINGS = {
+    "flow_rate": lambda d, e, k: d.flow_rate,
+    "hops": lambda d, e, k: (e["hops"][k], d.flow_rate),
+    "degree": lambda d, e, k: (e["degree"][k], d.flow_rate),
+    "bottleneck": lambda d, e, k: (e["bottleneck"][k], d.flow_rate),
+    # Capacity the demand is expected to consume, flow times path length
+    "rate_hops": lambda d, e, k: d.flow_rate * e["hops"][k],
+    # Share of the endpoint bottleneck the demand would take
+    "rate_bottleneck": lambda d, e, k: d.flow_rate / (e["bottleneck"][k] or 1),
+}
+
+def order_demands(instance, demands, order = "flow_rate", seed = None, landmarks = None):
+    # order is a name from ORDERINGS, or "random" for a seeded shuffle (random restarts)
+    if order == "random":
+        shuffled = list(demands)
+        random.Random(seed).shuffle(shuffled)
+        return shuffled
+    if order not in ORDERINGS:
+        raise ValueError("unknown demand ordering %s" % order)
+    key = ORDERINGS[order]
+    estimates = demand_estimates(instance, demands, landmarks) if order != "flow_rate" else None
+    ranked = sorted(range(len(demands)), key= lambda k: key(demands[k], estimates, k))
+    return [demands[k] for k in ranked]
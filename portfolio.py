@@ -0,0 +1,57 @@
+from heuristics import Solver
+import multiprocessing
+import os
+import signal
+import time
+
+# One Solver.solve configuration per worker, best first
+DEFAULT_CONFIGS = [
+    {"criteria": "min_dist", "order": True},
+    {"criteria": "max_cap", "order": True},
+    {"criteria": "min_dist", "order": True, "bidirectional": True, "improve": True},
+    {"criteria": "astar", "order": True, "weight": "hops"},
+    {"criteria": "max_cap", "order": "bottleneck", "neighbor_limit": 7},
+    {"criteria": "min_dist", "order": False, "improve": True},
+    {"criteria": "first_found", "order": "rate_hops", "bidirectional": True},
+    {"criteria": "dijkstra", "order": True, "weight": "capacity"},
+    {"criteria": "min_dist", "order": "random", "seed": 1, "bidirectional": True},
+]
+
+# Parsed instance shared with the forked workers, which see it copy-on-write
+_instance = None
+
+def score_flows(flows):
+    return sum(flow.flow_rate for flow in flows), len(flows)
+
+def run_config(tic, time_limit, config):
+    # Workers are terminated with SIGTERM, which must not trigger the parent's anytime flush
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    return Solver(_instance).solve(tic, time_limit=time_limit, **config)
+
+def solve_portfolio(instance, tic, time_limit = 1.9, configs = None, workers = None, margin = 0.15):
+    # Run the configurations in parallel worker processes and keep the best flow set.
+    # Workers stop margin seconds early to leave time for sending their flows back.
+    global _instance
+    configs = configs or DEFAULT_CONFIGS
+    workers = min(workers or os.cpu_count() or 1, len(configs))
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return Solver(instance).solve(tic, time_limit=time_limit, **configs[0])
+
+    _instance = instance
+    pool = multiprocessing.get_context("fork").Pool(workers)
+    try:
+        results = [pool.apply_async(run_config, (tic, time_limit - margin, config))
+            for config in configs[:workers]]
+        best_flows = []
+        for result in results:
+            try:
+                flows = result.get(max(tic + time_limit - time.time(), 0))
+            except multiprocessing.TimeoutError:
+                continue
+            if score_flows(flows) > score_flows(best_flows):
+                best_flows = flows
+    finally:
+        pool.terminate()
+        _instance = None
+
+    return best_flows
@@ -1,78 +1,148 @@
-from Edge import Edge
-from Group import Group
-from Node import Node
+from array import array
+from itertools import chain
 from Demand import Demand
 from Instance import Instance
-from Group import Group
+from contextlib import nullcontext
+import mmap
 import sys
-def set_finals(nodes_list, demand):
-    nodes_list[demand.start_id].set_final()
-    nodes_list[demand.end_id].set_final()
 
-def read_instance(path = None, criteria = "min_dist"):
-    
+# Compiled instance: magic, then int64 header (node_count, edge_count, constraints_count,
+# flow_count, criteria code, slot_count, peer_count), then the columns of binary_layout, 8-byte aligned
+BINARY_MAGIC = b"RTPBIN03"
+BINARY_HEADER_SIZE = len(BINARY_MAGIC) + 7 * 8
+CRITERIA_CODES = {"min_dist": 1, "max_cap": 2, "first_found": 3}
+
+def binary_layout(node_count, edge_count, constraints_count, flow_count, slot_count, peer_count):
+    return [
+        ("edge_group", 'i', edge_count),
+        ("edge_start", 'i', edge_count),
+        ("edge_end", 'i', edge_count),
+        ("edge_distance", 'q', edge_count),
+        ("edge_capacity", 'q', edge_count),
+        ("constraint_nodes", 'i', constraints_count),
+        ("constraint_edges1", 'i', constraints_count),
+        ("constraint_edges2", 'i', constraints_count),
+        ("constraint_offsets", 'i', edge_count + 1),
+        ("constraint_peers", 'i', peer_count),
+        ("demand_ids", 'q', flow_count),
+        ("demand_starts", 'q', flow_count),
+        ("demand_ends", 'q', flow_count),
+        ("demand_rates", 'q', flow_count),
+        ("node_offsets", 'i', node_count + 1),
+        ("adj_nodes", 'i', slot_count),
+        ("bundle_offsets", 'i', slot_count + 1),
+        ("adj_edges", 'i', 2 * edge_count),
+        ("reverse_slot", 'i', slot_count),
+    ]
+def set_finals(node_final, start_ids, end_ids):
+    for node_id in chain(start_ids, end_ids):
+        node_final[node_id] = 1
+
+def read_tokens(path = None):
+    # Whole input as one flat int64 array, converted in a single pass
     if path:
-        f = open(path)
-        lines = f.readlines()
+        with open(path, "rb") as f:
+            data = f.read()
     else:
-        lines = []
-        f = sys.stdin
-        line = input()
-        lines.append(line)
-        node_count, edge_count, constraints_count, flow_count = tuple(map(int,lines[0].strip().split(" ")))
-        for _ in range(edge_count + constraints_count + flow_count):
-            line = input()
-            lines.append(line)
-
-    node_count, edge_count, constraints_count, flow_count = tuple(map(int,lines[0].strip().split(" ")))
-
-    nodes_list = []
-    for i in range(node_count):
-        node_i = Node(i)
-        nodes_list.append(node_i)
-
-    edges_list = [0] * edge_count
-    groups = {}
-    for i in range(1,edge_count + 1):
-        edge_id, group_id, start_id, end_id, distance, capacity = tuple(map(int,lines[i].strip().split(" ")))
-        edge_i = Edge(edge_id, group_id, start_id, end_id, distance, capacity)
-        # Add to nodes
-        nodes_list[start_id].add_edge(edge_i)
-        nodes_list[end_id].add_edge(edge_i)
-        
-        #Add to group
-        groups.setdefault(group_id, Group(group_id,[]))
-        groups[group_id].add_edge(edge_id)
-    
-        edges_list[edge_id] = edge_i
-    
-    for i in range(node_count):
-        
-        sorted_neighbors = sorted(nodes_list[i].neighbors, key= lambda x: len(nodes_list[x].neighbors), reverse=True) # Sort the values
-        nodes_list[i].neighbors = sorted_neighbors
-
-        for n in nodes_list[i].neighbors:
-            if criteria == "min_dist":
-                nodes_list[i].neighbors[n] = \
-                    sorted(nodes_list[i].neighbors[n],key= lambda x: x.distance)
-            elif criteria == "max_cap":
-                nodes_list[i].neighbors[n] = \
-                    sorted(nodes_list[i].neighbors[n],key= lambda x: x.capacity, reverse = True)
-
-    for i in range(edge_count +1, edge_count+ constraints_count +1):
-        node_id, edge1_id, edge2_id = tuple(map(int,lines[i].strip().split(" ")))
-        edges_list[edge1_id].add_constraint(edge2_id)
-        edges_list[edge2_id].add_constraint(edge1_id)
-
-    demands_list = []
-    for i in range(edge_count+ constraints_count +1, edge_count+ constraints_count + flow_count +1):
-        demand_id, start_id, end_id, flow_rate = tuple(map(int,lines[i].strip().split(" ")))
-        demand_i = Demand(demand_id, start_id, end_id, flow_rate)
-        
-        set_finals(nodes_list, demand_i)
-        demands_list.append(demand_i)
+        data = sys.stdin.buffer.read()
+    return array('q', map(int, data.split()))
+
+def read_instance(path = None, criteria = "min_dist", profiler = None):
+
+    phase = profiler.phase if profiler is not None else lambda name: nullcontext()
+    with phase("parse"):
+        instance = parse_instance(path)
+    with phase("sort_neighbors"):
+        instance.build_adjacency(criteria)
+    return instance
+
+def parse_instance(path = None):
+    # Instance from the text format, adjacency not built yet
+    values = read_tokens(path)
+    node_count, edge_count, constraints_count, flow_count = values[0:4]
+
+    # Edge section, 6 columns per row
+    begin, end = 4, 4 + 6 * edge_count
+    edge_ids = values[begin:end:6]
+    edge_group = array('i', values[begin + 1:end:6])
+    edge_start = array('i', values[begin + 2:end:6])
+    edge_end = array('i', values[begin + 3:end:6])
+    edge_distance = values[begin + 4:end:6]
+    edge_capacity = values[begin + 5:end:6]
+    if edge_ids != array('q', range(edge_count)):
+        # Rows are not in edge_id order, scatter them
+        columns = (edge_group, edge_start, edge_end, edge_distance, edge_capacity)
+        sorted_columns = [column[:] for column in columns]
+        for row, edge_id in enumerate(edge_ids):
+            for column, sorted_column in zip(columns, sorted_columns):
+                sorted_column[edge_id] = column[row]
+        edge_group, edge_start, edge_end, edge_distance, edge_capacity = sorted_columns
+
+    # Constraint section, 3 columns per row
+    begin, end = end, end + 3 * constraints_count
+    constraint_nodes = array('i', values[begin:end:3])
+    constraint_edges1 = array('i', values[begin + 1:end:3])
+    constraint_edges2 = array('i', values[begin + 2:end:3])
+
+    # Demand section, 4 columns per row
+    begin, end = end, end + 4 * flow_count
+    start_ids, end_ids = values[begin + 1:end:4], values[begin + 2:end:4]
+    demands_list = list(map(Demand, values[begin:end:4], start_ids, end_ids, values[begin + 3:end:4]))
 
     instance = Instance(node_count, edge_count, constraints_count, flow_count,
-        nodes_list, edges_list, groups, demands_list)
+        edge_group, edge_start, edge_end, edge_distance, edge_capacity,
+        constraint_nodes, constraint_edges1, constraint_edges2, demands_list)
+    set_finals(instance.node_final, start_ids, end_ids)
+
+    return instance
+
+def read_binary_instance(path, criteria = "min_dist", profiler = None):
+    phase = profiler.phase if profiler is not None else lambda name: nullcontext()
+    with phase("parse"):
+        instance = map_binary_instance(path, criteria)
+    if instance.node_offsets is None:
+        with phase("sort_neighbors"):
+            instance.build_adjacency(criteria)
+    return instance
+
+def map_binary_instance(path, criteria = "min_dist"):
+    # Columns are memoryviews over a private (copy-on-write) mapping, so
+    # nothing is copied and residual updates never reach the file. The stored
+    # adjacency is only used when it was compiled for criteria.
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    buffer = memoryview(mapping)
+
+    if bytes(buffer[:len(BINARY_MAGIC)]) != BINARY_MAGIC:
+        raise ValueError("%s is not a compiled instance" % path)
+    node_count, edge_count, constraints_count, flow_count, criteria_code, slot_count, peer_count = \
+        buffer[len(BINARY_MAGIC):BINARY_HEADER_SIZE].cast('q')
+
+    columns = {}
+    offset = BINARY_HEADER_SIZE
+    for name, typecode, length in binary_layout(node_count, edge_count,
+            constraints_count, flow_count, slot_count, peer_count):
+        size = length * array(typecode).itemsize
+        columns[name] = buffer[offset:offset + size].cast(typecode)
+        offset += (size + 7) & ~7
+
+    start_ids, end_ids = columns["demand_starts"], columns["demand_ends"]
+    demands_list = list(map(Demand, columns["demand_ids"], start_ids, end_ids, columns["demand_rates"]))
+
+    instance = Instance(node_count, edge_count, constraints_count, flow_count,
+        columns["edge_group"], columns["edge_start"], columns["edge_end"],
+        columns["edge_distance"], columns["edge_capacity"],
+        columns["constraint_nodes"], columns["constraint_edges1"], columns["constraint_edges2"],
+        demands_list, constraint_offsets=columns["constraint_offsets"],
+        constraint_peers=columns["constraint_peers"])
+
+    if criteria_code == CRITERIA_CODES.get(criteria):
+        instance.criteria = criteria
+        instance.node_offsets = columns["node_offsets"]
+        instance.adj_nodes = columns["adj_nodes"]
+        instance.bundle_offsets = columns["bundle_offsets"]
+        instance.adj_edges = columns["adj_edges"]
+        instance.reverse_slot = columns["reverse_slot"]
+    set_finals(instance.node_final, start_ids, end_ids)
 
-    return instance
\ No newline at end of file
+    return instance
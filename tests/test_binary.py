@@ -0,0 +1,36 @@
+import pytest
+
+from generator import generate_instance
+from reader import read_instance, read_binary_instance
+from writer import compile_instance
+
+# Every column stored by write_binary_instance, plus the final-node flags set on load
+COLUMNS = ["edge_group", "edge_start", "edge_end", "edge_distance", "edge_capacity",
+    "constraint_nodes", "constraint_edges1", "constraint_edges2",
+    "constraint_offsets", "constraint_peers", "node_offsets", "adj_nodes",
+    "bundle_offsets", "adj_edges", "reverse_slot", "node_final"]
+
+
+@pytest.mark.parametrize("criteria", ["min_dist", "max_cap"])
+def test_compiled_instance_round_trip(tmp_path, criteria):
+    path = tmp_path / "instance.txt"
+    path.write_text(generate_instance("geometric", 200, 5))
+    binary_path = str(tmp_path / "instance.bin")
+    compile_instance(str(path), binary_path, criteria)
+
+    text = read_instance(str(path), criteria=criteria)
+    binary = read_binary_instance(binary_path, criteria=criteria)
+    assert (binary.node_count, binary.edge_count, binary.constraints_count, binary.flow_count) == \
+        (text.node_count, text.edge_count, text.constraints_count, text.flow_count)
+    for name in COLUMNS:
+        assert list(getattr(binary, name)) == list(getattr(text, name)), name
+    assert binary.criteria == criteria
+    assert [(d.demand_id, d.start_id, d.end_id, d.flow_rate) for d in binary.demands_list] == \
+        [(d.demand_id, d.start_id, d.end_id, d.flow_rate) for d in text.demands_list]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "instance.txt"
+    path.write_text(generate_instance("grid", 20, 1))
+    with pytest.raises(ValueError):
+        read_binary_instance(str(path))
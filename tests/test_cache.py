@@ -0,0 +1,51 @@
+from PathCache import PathCache
+from reader import read_instance
+
+# A line 0-1-2-3 with a single demand between its ends, so nodes 0 and 3 are final
+LINE = """4 3 0 1
+0 0 0 1 1 10
+1 1 1 2 1 10
+2 2 2 3 1 10
+0 0 3 5
+"""
+
+
+def load(tmp_path):
+    path = tmp_path / "line.txt"
+    path.write_text(LINE)
+    return read_instance(str(path))
+
+
+def test_serves_sub_paths_in_both_directions(tmp_path):
+    cache = PathCache(load(tmp_path))
+    cache.add_path([0, 1, 2, 3], [0, 1, 2])
+    assert cache.get(0, 3) == [0, 1, 2]
+    assert cache.get(3, 0) == [2, 1, 0]
+    assert cache.get(2, 0) == [1, 0]
+    assert cache.get(1, 3) == [1, 2]
+    # Only pairs with a final node are stored
+    assert cache.get(1, 2) is None
+    assert (cache.hits, cache.misses, cache.stale) == (4, 1, 0)
+
+
+def test_touched_edges_invalidate_their_entries(tmp_path):
+    cache = PathCache(load(tmp_path))
+    cache.add_path([0, 1, 2, 3], [0, 1, 2])
+    cache.touch([2])
+    assert cache.get(0, 3) is None
+    assert cache.get(3, 1) is None
+    assert cache.stale == 2
+    # Entries over untouched edges are still served, stale ones are gone
+    assert cache.get(0, 2) == [0, 1]
+    assert len(cache) == 3
+    # Stored again after the change, the path is current
+    cache.add_path([0, 1, 2, 3], [0, 1, 2])
+    assert cache.get(0, 3) == [0, 1, 2]
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = PathCache(load(tmp_path), max_entries=2)
+    cache.add_path([0, 1, 2, 3], [0, 1, 2])
+    assert len(cache) == 2
+    assert cache.get(0, 1) is None
+    assert cache.get(3, 2) == [2]
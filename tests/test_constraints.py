@@ -0,0 +1,55 @@
+from reader import read_instance
+
+# Nodes 0..4: a short route 0-1-2, a detour 1-3-2, a long route 0-4-2 and a parallel
+# edge 6 next to edge 1. Pairs are repeated and reversed to exercise the deduplication.
+INSTANCE = """5 7 6 1
+0 0 0 1 1 10
+1 1 1 2 1 10
+2 2 1 3 1 10
+3 3 3 2 1 10
+4 4 0 4 5 10
+5 5 4 2 5 10
+6 6 1 2 1 10
+1 0 1
+1 1 0
+1 0 1
+2 1 3
+1 1 6
+1 1 6
+0 0 2 5
+"""
+
+
+def load(tmp_path):
+    path = tmp_path / "constraints.txt"
+    path.write_text(INSTANCE)
+    return read_instance(str(path))
+
+
+def test_constraint_csr_holds_sorted_unique_peers(tmp_path):
+    instance = load(tmp_path)
+    peers = [list(instance.constrained_peers(edge_id)) for edge_id in range(instance.edge_count)]
+    assert peers == [[1], [0, 3, 6], [], [1], [], [], [1]]
+    assert len(instance.constraint_peers) == 6
+    assert list(instance.edge_constrained) == [1, 1, 0, 1, 0, 0, 1]
+
+
+def test_node_index_keeps_pairs_at_their_node(tmp_path):
+    instance = load(tmp_path)
+    assert list(instance.node_constrained) == [0, 1, 1, 0, 0]
+    assert list(instance.node_peers(1, 1)) == [0, 6]
+    assert list(instance.node_peers(2, 1)) == [3]
+    # Edges 1 and 6 also meet at node 2, where they are not constrained
+    assert list(instance.node_peers(2, 6)) == []
+    assert list(instance.node_peers(1, 2)) == []
+
+
+def test_edge_view_checks_pairs_per_node(tmp_path):
+    instance = load(tmp_path)
+    edges = instance.edges_list
+    assert edges[1].is_constrained(edges[6], 1)
+    assert not edges[1].is_constrained(edges[6], 2)
+    assert edges[3].is_constrained(edges[1], 2)
+    assert not edges[0].is_constrained(edges[2], 1)
+    assert edges[1].constrained_edges(1) == {0, 6}
+    assert edges[1].constrained_edges(2) == {3}
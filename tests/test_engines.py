@@ -0,0 +1,154 @@
+import time
+
+import pytest
+
+from Deadline import Deadline
+from generator import generate_instance
+from heuristics import Solver
+from Landmarks import Landmarks
+from reader import read_instance
+
+# Nodes 0..5: routes 0-4-1-2 and 0-5-3-2, the first one forbidden at node 1. Growing
+# from both ends, the backward tree reaches node 1 first, so the pair is only seen at
+# the meeting point.
+DETOUR = """6 6 1 1
+0 0 0 4 1 10
+1 1 0 5 1 10
+2 2 4 1 1 10
+3 3 1 2 1 10
+4 4 5 3 1 10
+5 5 3 2 1 10
+1 2 3
+0 0 2 5
+"""
+
+# Nodes 0..2: the only route 0-1-2 is forbidden at node 1
+BLOCKED = """3 2 1 1
+0 0 0 1 1 10
+1 1 1 2 1 10
+1 0 1
+0 0 2 5
+"""
+
+# Nodes 0..3: node 1 is closest through edge 0, but only arriving through edge 2 may
+# go on to node 2, so a search keeping one state per node misses 0-3-1-2
+REENTRY = """4 4 1 1
+0 0 0 1 1 10
+1 1 0 3 1 10
+2 2 3 1 1 10
+3 3 1 2 1 10
+1 0 3
+0 0 2 5
+"""
+
+ENGINES = ["bfs", "bidirectional", "dijkstra", "astar"]
+# Engines that search (node, incoming edge) states at constrained nodes
+EXACT_ENGINES = ["dijkstra", "astar"]
+
+
+def route(solver, engine, demand):
+    deadline = Deadline(5)
+    if engine in EXACT_ENGINES:
+        # The exact search must find the route by itself, not through its BFS fallback
+        solver.get_path_bfs = lambda demand, deadline, criteria: None
+    if engine == "dijkstra":
+        return solver.get_path_dijkstra(demand, deadline)
+    if engine == "astar":
+        return solver.get_path_dijkstra(demand, deadline, landmarks=Landmarks(solver.instance))
+    if engine == "bidirectional":
+        return solver.get_path_bidirectional(demand, deadline, criteria="min_dist")
+    return solver.get_path_bfs(demand, deadline, criteria="min_dist")
+
+
+def check_flows(text, flows, sfl = 200, gfl = 100):
+    # Replays flows against the text instance, independently of the solver's indexes
+    rows = [list(map(int, line.split())) for line in text.split("\n") if line.strip()]
+    node_count, edge_count, constraints_count, flow_count = rows[0]
+    edges = {row[0]: row[1:] for row in rows[1:1 + edge_count]}
+    forbidden = set()
+    for node_id, edge1_id, edge2_id in rows[1 + edge_count:1 + edge_count + constraints_count]:
+        forbidden.update(((node_id, edge1_id, edge2_id), (node_id, edge2_id, edge1_id)))
+    demands = {row[0]: row[1:] for row in rows[1 + edge_count + constraints_count:]}
+    capacity = {edge_id: edge[4] for edge_id, edge in edges.items()}
+    node_load = [0] * node_count
+    group_load = {}
+    for flow in flows:
+        start_id, end_id, rate = demands[flow.flow_id]
+        node_id, prev_edge, nodes = start_id, None, [start_id]
+        for edge_id in flow.edge_ids:
+            group_id, a, b = edges[edge_id][:3]
+            assert node_id in (a, b), ("disconnected", flow.flow_id)
+            assert (node_id, prev_edge, edge_id) not in forbidden, ("constraint", flow.flow_id)
+            capacity[edge_id] -= rate
+            group_load[group_id] = group_load.get(group_id, 0) + 1
+            node_id, prev_edge = (b if node_id == a else a), edge_id
+            nodes.append(node_id)
+        assert node_id == end_id, ("end", flow.flow_id)
+        assert len(set(nodes)) == len(nodes), ("loop", flow.flow_id)
+        for node_id in nodes:
+            node_load[node_id] += 1
+    assert min(capacity.values(), default=0) >= 0
+    assert max(group_load.values(), default=0) <= gfl
+    assert max(node_load) <= sfl
+
+
+def solve(solver, engine):
+    if engine in EXACT_ENGINES:
+        return solver.solve(time.time(), criteria=engine, order=True, time_limit=30)
+    return solver.solve(time.time(), criteria="min_dist", order=True, time_limit=30,
+        bidirectional=engine == "bidirectional")
+
+
+def load(tmp_path, text):
+    path = tmp_path / "instance.txt"
+    path.write_text(text)
+    return read_instance(str(path))
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_detours_around_a_forbidden_pair(tmp_path, engine):
+    instance = load(tmp_path, DETOUR)
+    solver = Solver(instance)
+    flow = route(solver, engine, instance.demands_list[0])
+    assert flow is not None and solver.check_path(flow)
+    assert flow.edge_ids == [1, 4, 5]
+    check_flows(DETOUR, [flow])
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_rejects_a_route_through_a_forbidden_pair(tmp_path, engine):
+    instance = load(tmp_path, BLOCKED)
+    solver = Solver(instance)
+    flow = route(solver, engine, instance.demands_list[0])
+    assert flow is None or not solver.check_path(flow)
+
+
+@pytest.mark.parametrize("engine", EXACT_ENGINES)
+def test_reenters_a_node_through_another_edge(tmp_path, engine):
+    instance = load(tmp_path, REENTRY)
+    solver = Solver(instance)
+    flow = route(solver, engine, instance.demands_list[0])
+    assert flow is not None and solver.check_path(flow)
+    assert flow.edge_ids == [1, 2, 3]
+    check_flows(REENTRY, [flow])
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_solved_flows_respect_every_limit(tmp_path, engine):
+    text = generate_instance("grid", 400, 5, constraint_ratio=0.3)
+    instance = load(tmp_path, text)
+    solver = Solver(instance)
+    flows = solve(solver, engine)
+    assert flows
+    check_flows(text, flows)
+
+
+def test_astar_matches_dijkstra_distances(tmp_path):
+    instance = load(tmp_path, generate_instance("geometric", 300, 7, constraint_ratio=0.3))
+    solver = Solver(instance)
+    landmarks = Landmarks(instance)
+    solver.get_path_bfs = lambda demand, deadline, criteria: None
+    length = lambda flow: flow and sum(instance.edge_distance[edge_id] for edge_id in flow.edge_ids)
+    for demand in instance.demands_list[:40]:
+        expected = length(solver.get_path_dijkstra(demand, Deadline(5)))
+        assert length(solver.get_path_dijkstra(demand, Deadline(5), landmarks=landmarks)) == expected
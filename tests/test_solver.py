@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from Deadline import Deadline
+from generator import generate_instance
+from heuristics import Solver
+from portfolio import score_flows
+from reader import read_instance
+
+
+def load(tmp_path, topology, size, seed, criteria = "min_dist"):
+    path = tmp_path / ("%s-%d-%d.txt" % (topology, size, seed))
+    path.write_text(generate_instance(topology, size, seed))
+    return read_instance(str(path), criteria=criteria)
+
+
+def residual_state(solver):
+    instance = solver.instance
+    return (bytes(instance.edge_capacity), bytes(instance.group_GFL), bytes(instance.node_SFL),
+        solver.feasibility.snapshot(),
+        {flow_id: tuple(flow.edge_ids) for flow_id, flow in solver.flows.items()})
+
+
+def check_bundle_bounds(solver):
+    # bundle_max bounds each bundle's usable residual from above, and is exact once
+    # the slot was refreshed (moved off its initial value, the largest capacity)
+    instance = solver.instance
+    edge_bucket = solver.feasibility.edge_bucket
+    top = solver.capacity_scale - 1
+    for slot in range(len(instance.adj_nodes)):
+        usable = max(instance.edge_capacity[edge_id] if edge_bucket[edge_id] else 0
+            for edge_id in instance.adj_edges[instance.bundle_offsets[slot]:instance.bundle_offsets[slot + 1]])
+        bound = solver.bundles.bundle_max[slot]
+        assert bound >= usable
+        assert bound == top or bound == usable
+
+
+@pytest.mark.parametrize("topology,routed", [("grid", None), ("hub", None), ("geometric", 50)])
+def test_rollback_restores_residual_state(tmp_path, topology, routed):
+    instance = load(tmp_path, topology, 300 if routed else 120, 3)
+    # routed limits the first pass to a few demands, so most bundles are still untouched
+    instance.demands_list, rest = instance.demands_list[:routed], instance.demands_list[routed:]
+    solver = Solver(instance)
+    solver.solve(time.time(), criteria="min_dist", order=True, time_limit=30)
+    instance.demands_list += rest
+    before = residual_state(solver)
+
+    # Release a few committed flows, then route and commit the other demands over the freed capacity
+    mark = len(solver.journal)
+    released = set()
+    for flow in list(solver.flows.values())[:5]:
+        solver.release_flow(flow)
+        released.add(flow.flow_id)
+    deadline = Deadline(30)
+    for demand in instance.demands_list:
+        if demand.demand_id in solver.flows or demand.demand_id in released:
+            continue
+        flow = solver.get_path_bfs(demand, deadline, criteria="min_dist")
+        if flow and solver.check_path(flow):
+            solver.commit_flow(flow)
+    assert bytes(instance.edge_capacity) != before[0]
+    check_bundle_bounds(solver)
+
+    solver.rollback(mark)
+    assert residual_state(solver) == before
+    check_bundle_bounds(solver)
+
+
+@pytest.mark.parametrize("topology,seed", [("grid", 1), ("geometric", 2), ("hub", 3)])
+def test_improve_never_lowers_routed_rate(tmp_path, topology, seed):
+    scores = []
+    for improve in (False, True):
+        instance = load(tmp_path, topology, 150, seed)
+        flows = Solver(instance).solve(time.time(), criteria="min_dist", order=True,
+            time_limit=30, bidirectional=True, improve=improve)
+        scores.append(score_flows(flows)[0])
+    assert scores[1] >= scores[0]
+
+
+def test_restore_drops_cached_paths(tmp_path):
+    instance = load(tmp_path, "grid", 120, 4)
+    solver = Solver(instance)
+    empty = solver.snapshot()
+    solver.solve(time.time(), criteria="min_dist", order=True, time_limit=30)
+    assert len(solver.cache)
+    solver.restore(empty)
+    # Paths cached under the discarded flows must not be served
+    assert all(solver.cache.get(demand.start_id, demand.end_id) is None for demand in instance.demands_list)
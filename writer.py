@@ -1,9 +1,49 @@
+from array import array
+from FlowWriter import FlowWriter
+from reader import read_instance, binary_layout, BINARY_MAGIC, CRITERIA_CODES
 
-def write_flows(flows):
-    print(len(flows))
-    lines = []
+def write_flows(flows, stream = None):
+    writer = FlowWriter(stream)
     for flow in flows:
-        line = " ".join([str(flow.flow_id)] + list(map(str, flow.edge_ids))) 
-        lines.append(line)
-    
-    print("\n".join(lines))
+        writer.add(flow)
+    writer.flush()
+
+def write_binary_instance(instance, path):
+    demands_list = instance.demands_list
+    columns = {
+        "edge_group": instance.edge_group,
+        "edge_start": instance.edge_start,
+        "edge_end": instance.edge_end,
+        "edge_distance": instance.edge_distance,
+        "edge_capacity": instance.edge_capacity,
+        "constraint_nodes": instance.constraint_nodes,
+        "constraint_edges1": instance.constraint_edges1,
+        "constraint_edges2": instance.constraint_edges2,
+        "constraint_offsets": instance.constraint_offsets,
+        "constraint_peers": instance.constraint_peers,
+        "demand_ids": [d.demand_id for d in demands_list],
+        "demand_starts": [d.start_id for d in demands_list],
+        "demand_ends": [d.end_id for d in demands_list],
+        "demand_rates": [d.flow_rate for d in demands_list],
+        "node_offsets": instance.node_offsets,
+        "adj_nodes": instance.adj_nodes,
+        "bundle_offsets": instance.bundle_offsets,
+        "adj_edges": instance.adj_edges,
+        "reverse_slot": instance.reverse_slot,
+    }
+    slot_count = len(instance.adj_nodes)
+    peer_count = len(instance.constraint_peers)
+
+    with open(path, "wb") as f:
+        f.write(BINARY_MAGIC)
+        f.write(array('q', [instance.node_count, instance.edge_count, instance.constraints_count,
+            instance.flow_count, CRITERIA_CODES.get(instance.criteria, 0), slot_count, peer_count]))
+        for name, typecode, length in binary_layout(instance.node_count, instance.edge_count,
+                instance.constraints_count, instance.flow_count, slot_count, peer_count):
+            column = array(typecode, columns[name])
+            assert len(column) == length, name
+            f.write(column)
+            f.write(bytes(-len(column) * column.itemsize % 8))
+
+def compile_instance(path, binary_path, criteria = "min_dist"):
+    write_binary_instance(read_instance(path, criteria), binary_path)